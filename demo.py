@@ -14,9 +14,19 @@ from git_ai.llm_client import LLMClient
 from git_ai.config import config
 from rich.console import Console
 from rich.panel import Panel
+from rich.style import Style
 from rich.table import Table
 
-console = Console()
+# Highlighting is off so rows aren't re-scanned by the auto-highlight regexes
+console = Console(highlight=False)
+
+_STATUS_MAP = {"A": "Added", "M": "Modified", "D": "Deleted"}
+
+_HEADER_STYLE = Style.parse("bold cyan")
+_CYAN_STYLE = Style.parse("cyan")
+_GREEN_STYLE = Style.parse("green")
+_YELLOW_STYLE = Style.parse("yellow")
+_WHITE_STYLE = Style.parse("white")
 
 
 def create_demo_repo():
@@ -200,13 +210,12 @@ def show_staged_changes(git_repo):
     """Display staged changes."""
     summary = git_repo.get_diff_summary()
 
-    table = Table(title="Staged Changes", show_header=True, header_style="bold cyan")
-    table.add_column("File", style="cyan")
-    table.add_column("Status", style="green")
+    table = Table(title="Staged Changes", show_header=True, header_style=_HEADER_STYLE)
+    table.add_column("File", style=_CYAN_STYLE)
+    table.add_column("Status", style=_GREEN_STYLE)
 
-    status_map = {"A": "Added", "M": "Modified", "D": "Deleted"}
     for file_info in summary["files_changed"]:
-        status = status_map.get(file_info["type"], file_info["type"])
+        status = _STATUS_MAP.get(file_info["type"], file_info["type"])
         table.add_row(file_info["path"], status)
 
     console.print(table)
@@ -216,9 +225,9 @@ def show_commit_history(repo):
     """Show final commit history."""
     console.print("\n[bold cyan]Final Commit History:[/bold cyan]\n")
 
-    table = Table(show_header=True, header_style="bold cyan")
-    table.add_column("Hash", style="yellow")
-    table.add_column("Message", style="white")
+    table = Table(show_header=True, header_style=_HEADER_STYLE)
+    table.add_column("Hash", style=_YELLOW_STYLE)
+    table.add_column("Message", style=_WHITE_STYLE)
 
     for commit in repo.iter_commits(max_count=10):
         table.add_row(
@@ -1,12 +1,28 @@
 """git-ai: AI-powered git commit message generator."""
 
+import importlib
+
 __version__ = "0.1.0"
 __author__ = "Aju John"
 __email__ = "aju@ajujohn.me"
 
-from .cli import main
-from .git_utils import GitRepo
-from .llm_client import LLMClient
+# config is cheap to import and shares its name with the git_ai.config
+# submodule, so it is bound eagerly; the rest load on first access (PEP 562).
 from .config import config
 
+_LAZY_ATTRS = {
+    "main": ".cli",
+    "GitRepo": ".git_utils",
+    "LLMClient": ".llm_client",
+}
+
 __all__ = ["main", "GitRepo", "LLMClient", "config"]
+
+
+def __getattr__(name: str):
+    """Import public names on first access."""
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
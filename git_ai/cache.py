@@ -0,0 +1,109 @@
+"""On-disk cache for generated commit messages."""
+
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+DEFAULT_TTL = 7 * 24 * 60 * 60  # 7 days, in seconds
+LOCK_TIMEOUT = 1  # seconds to wait for another process holding the database
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache with per-entry expiry."""
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        """Initialize ResponseCache.
+
+        Args:
+            cache_path: Path to the cache database. Defaults to ~/.git-ai/llm_cache.sqlite.
+        """
+        self.cache_path = cache_path or Path.home() / ".git-ai" / "llm_cache.sqlite"
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from the inputs that determine a response.
+
+        Args:
+            parts: Strings that identify the request (provider, model, prompt, ...).
+
+        Returns:
+            Hex BLAKE2b digest (128-bit) of the parts.
+        """
+        return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the cache database in a transaction, creating it if needed."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.cache_path, timeout=LOCK_TIMEOUT)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS kv ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get cached value.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            Cached value, or None if missing, expired or the database can't be read.
+        """
+        if not self.cache_path.exists():
+            return None
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM kv WHERE key = ? AND expires > ?",
+                    (key, time.time()),
+                ).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+        return row[0] if row else None
+
+    def put(self, key: str, value: str, ttl: int = DEFAULT_TTL):
+        """Store value in the cache, dropping expired entries.
+
+        The write is skipped if the database can't be written.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            ttl: Time to live in seconds.
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM kv WHERE expires <= ?", (now,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                    (key, value, now + ttl),
+                )
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self) -> int:
+        """Remove all cached entries.
+
+        Returns:
+            Number of entries removed.
+        """
+        if not self.cache_path.exists():
+            return 0
+
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM kv").rowcount
+
+
+# Global cache instance
+response_cache = ResponseCache()
@@ -1,20 +1,32 @@
 """Command-line interface for git-ai."""
 
+import os
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
 import click
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
-from rich.syntax import Syntax
-from rich.table import Table
-from rich import print as rprint
+from rich.style import Style
 
+from .cache import response_cache
 from .git_utils import GitRepo, GitError
 from .llm_client import LLMClient
-from .config import config
+from .config import PROVIDER_ENV_VAR, config
+from .diff_compress import compress_patches
 
 console = Console()
 
+_STATUS_MAP = {"A": "Added", "M": "Modified", "D": "Deleted", "R": "Renamed"}
+
+# Parsed once so tables don't re-parse style strings for every column
+_HEADER_STYLE = Style.parse("bold cyan")
+_CYAN_STYLE = Style.parse("cyan")
+_GREEN_STYLE = Style.parse("green")
+
 
 @click.group()
 @click.version_option(version="0.1.0")
@@ -28,16 +40,20 @@ def cli():
               default="conventional", help="Commit message style")
 @click.option("--dry-run", is_flag=True, help="Generate message without committing")
 @click.option("--no-edit", is_flag=True, help="Skip interactive editing")
-@click.option("--provider", type=click.Choice(["anthropic", "openai", "ollama"]), 
+@click.option("--provider", type=click.Choice(["anthropic", "openai", "ollama", "mock"]), 
               help="LLM provider to use")
-def commit(style: str, dry_run: bool, no_edit: bool, provider: str):
+@click.option("--no-cache", is_flag=True, help="Ignore cached messages for this diff")
+def commit(style: str, dry_run: bool, no_edit: bool, provider: str, no_cache: bool):
     """Generate and create a commit with AI-generated message."""
     try:
         # Initialize
         repo = GitRepo()
         
         if provider:
-            config.set("provider", provider)
+            # Takes precedence over both the config file and GIT_AI_PROVIDER
+            os.environ[PROVIDER_ENV_VAR] = provider
+        if no_cache:
+            config.set("cache_enabled", False)
         
         llm = LLMClient()
 
@@ -47,19 +63,33 @@ def commit(style: str, dry_run: bool, no_edit: bool, provider: str):
             console.print("Use [cyan]git add[/cyan] to stage your changes first.")
             sys.exit(1)
 
-        # Show what's being committed
-        _show_staged_changes(repo)
+        diff_summary = repo.get_diff_summary()
 
-        # Get diff and generate message
+        # Get diff and recent commits; both read git independently
         with console.status("[bold green]Analyzing changes..."):
-            diff = repo.get_staged_diff()
-            diff_summary = repo.get_diff_summary()
-            recent_commits = repo.get_recent_commits()
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                diff_future = pool.submit(
+                    compress_patches,
+                    repo.iter_staged_patches(),
+                    int(config.get("max_diff_length", 4000)),
+                )
+                recent_future = pool.submit(repo.get_recent_commits)
+                diff = diff_future.result()
+                recent_commits = recent_future.result()
+
+        # Start generating before showing the staged changes, so the request
+        # runs while the user reads the table
+        pending = _prefetch(
+            llm.generate_commit_message, diff, diff_summary, recent_commits, style
+        )
+
+        # Show what's being committed
+        _show_staged_changes(repo, diff_summary)
 
         with console.status("[bold green]Generating commit message..."):
-            message = llm.generate_commit_message(
-                diff, diff_summary, recent_commits, style
-            )
+            message = pending.result()
+        if llm.cache_hit:
+            console.print("\n[dim]Using cached message for this diff (--no-cache to regenerate)[/dim]")
 
         # Display generated message
         console.print("\n[bold green]Generated commit message:[/bold green]")
@@ -67,7 +97,17 @@ def commit(style: str, dry_run: bool, no_edit: bool, provider: str):
 
         # Interactive editing unless --no-edit
         if not no_edit:
-            message = _interactive_edit(message, llm, dry_run)
+            fetch_variants = None
+            variants = None
+            if config.get("prefetch_variants", True):
+                fetch_variants = partial(
+                    llm.generate_variants, diff, diff_summary, recent_commits, style
+                )
+                # Fetch alternatives for "regenerate" while the user reads this
+                # one; a cached message is often accepted, so wait for "r" then
+                if not llm.cache_hit:
+                    variants = _prefetch(fetch_variants)
+            message = _interactive_edit(message, llm, dry_run, variants, fetch_variants)
 
         # Commit or dry-run
         if dry_run:
@@ -93,7 +133,7 @@ def status():
     """Show git status and staged changes."""
     try:
         repo = GitRepo()
-        _show_staged_changes(repo)
+        _show_staged_changes(repo, repo.get_diff_summary())
     except GitError as e:
         console.print(f"[red]Git Error:[/red] {e}")
         sys.exit(1)
@@ -104,6 +144,14 @@ def status():
 @click.argument("value")
 def config_set(key: str, value: str):
     """Set configuration value."""
+    import yaml
+
+    # Parse like the config file does, so "false" and "0.5" aren't stored as strings
+    try:
+        value = yaml.safe_load(value)
+    except yaml.YAMLError:
+        pass
+
     try:
         # Handle nested keys like model.anthropic
         if "." in key:
@@ -132,10 +180,12 @@ def config_get(key: str):
         value = config.get(key)
         console.print(f"{key}: {value}")
     else:
+        from rich.table import Table
+
         # Show all config
         table = Table(title="git-ai Configuration")
-        table.add_column("Key", style="cyan")
-        table.add_column("Value", style="green")
+        table.add_column("Key", style=_CYAN_STYLE)
+        table.add_column("Value", style=_GREEN_STYLE)
 
         for k, v in config.config.items():
             if isinstance(v, dict):
@@ -147,6 +197,23 @@ def config_get(key: str):
         console.print(table)
 
 
+@cli.group()
+def cache():
+    """Manage the commit message cache."""
+    pass
+
+
+@cache.command("clear")
+def cache_clear():
+    """Remove all cached commit messages."""
+    try:
+        removed = response_cache.clear()
+        console.print(f"[green]✓ Cache cleared:[/green] {removed} entry(ies) removed")
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+
+
 @cli.command()
 def setup():
     """Interactive setup wizard."""
@@ -192,29 +259,66 @@ def setup():
     console.print(f"Config saved to: {config.config_path}")
 
 
-def _show_staged_changes(repo: GitRepo):
+def _build_changes_table():
+    """Create an empty File/Status table for staged changes."""
+    from rich.table import Table
+
+    table = Table(show_header=True, header_style=_HEADER_STYLE)
+    table.add_column("File", style=_CYAN_STYLE)
+    table.add_column("Status", style=_GREEN_STYLE)
+    return table
+
+
+def _show_staged_changes(repo: GitRepo, summary: dict):
     """Display staged changes in a nice format."""
-    summary = repo.get_diff_summary()
     files_changed, total_changes = repo.get_commit_stats()
 
     console.print("\n[bold]Staged Changes:[/bold]")
     
-    table = Table(show_header=True, header_style="bold cyan")
-    table.add_column("File", style="cyan")
-    table.add_column("Status", style="green")
+    table = _build_changes_table()
 
     for file_info in summary["files_changed"]:
-        status_map = {"A": "Added", "M": "Modified", "D": "Deleted", "R": "Renamed"}
-        status = status_map.get(file_info["type"], file_info["type"])
+        status = _STATUS_MAP.get(file_info["type"], file_info["type"])
         table.add_row(file_info["path"], status)
 
     console.print(table)
     console.print(f"\n[dim]{files_changed} file(s), {total_changes} change(s)[/dim]")
 
 
-def _interactive_edit(message: str, llm: LLMClient, dry_run: bool) -> str:
-    """Interactive message editing loop."""
+def _prefetch(fn, *args) -> Future:
+    """Run fn in a daemon thread so exiting early never waits on it."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _interactive_edit(
+    message: str,
+    llm: LLMClient,
+    dry_run: bool,
+    variants: Optional[Future] = None,
+    fetch_variants: Optional[Callable[[], list[str]]] = None,
+) -> str:
+    """Interactive message editing loop.
+
+    Args:
+        message: Generated commit message.
+        llm: LLM client used for refinement.
+        dry_run: Whether this is a dry run.
+        variants: Future resolving to alternative messages for regeneration.
+        fetch_variants: Fetches the alternatives on the first regeneration
+            when ``variants`` is not given.
+    """
     current_message = message
+    candidates = []
+    next_candidate = 0
 
     while True:
         console.print("\n[bold]Options:[/bold]")
@@ -229,15 +333,26 @@ def _interactive_edit(message: str, llm: LLMClient, dry_run: bool) -> str:
         if choice == "a":
             return current_message
         elif choice == "r":
-            with console.status("[bold green]Regenerating..."):
-                # Re-generate with slightly different temperature
-                original_temp = config.get("temperature", 0.3)
-                config.set("temperature", min(original_temp + 0.2, 1.0))
-                
-                # This would need the original parameters - simplified here
-                console.print("[yellow]Feature coming soon: regeneration with variation[/yellow]")
-                
-                config.set("temperature", original_temp)
+            if not candidates:
+                if variants is None and fetch_variants is not None:
+                    variants = _prefetch(fetch_variants)
+                if variants is None:
+                    console.print("[yellow]Regeneration is disabled (prefetch_variants is off).[/yellow]")
+                    continue
+                try:
+                    with console.status("[bold green]Regenerating..."):
+                        candidates = [message] + [v for v in variants.result() if v != message]
+                except Exception as e:
+                    console.print(f"[red]Error:[/red] {e}")
+                    continue
+
+            # Cycle through the prefetched variants, then back to the original
+            next_candidate = (next_candidate + 1) % len(candidates)
+            current_message = candidates[next_candidate]
+            console.print(
+                f"\n[bold green]Variant {next_candidate + 1}/{len(candidates)}:[/bold green]"
+            )
+            console.print(Panel(current_message, border_style="green"))
         elif choice == "e":
             console.print("\n[dim]Enter your commit message (Ctrl+D or Ctrl+Z when done):[/dim]")
             lines = []
@@ -1,23 +1,37 @@
 """Configuration management for git-ai."""
 
+import json
 import os
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
-import yaml
-from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+
+# Overrides the configured provider, e.g. GIT_AI_PROVIDER=mock in tests and CI
+PROVIDER_ENV_VAR = "GIT_AI_PROVIDER"
+
+
+def _ensure_env_loaded():
+    """Load variables from .env on first use rather than at import time."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
 
 
 class Config:
     """Configuration manager for git-ai."""
 
     DEFAULT_CONFIG = {
-        "provider": "anthropic",  # anthropic, openai, ollama
+        "provider": "anthropic",  # anthropic, openai, ollama, mock
         "model": {
             "anthropic": "claude-sonnet-4-20250514",
             "openai": "gpt-4-turbo-preview",
             "ollama": "llama2",
+            "mock": "mock",
         },
         "commit_types": [
             "feat",
@@ -32,27 +46,97 @@ class Config:
             "build",
         ],
         "max_diff_length": 4000,  # characters
+        "max_diff_tokens": None,  # defaults to max_diff_length / 4
         "temperature": 0.3,
+        "max_output_tokens": 200,  # caps response length and decode time
+        "refine_max_tokens": 150,
         "use_toon": False,  # Enable TOON format for cost optimization
+        "prefetch_variants": True,  # Pre-generate alternatives for "regenerate"
+        "cache_enabled": True,  # Reuse messages for identical prompts
+        "request_timeout": 30,  # seconds, per attempt
+        "max_retries": 2,  # retries after a failed request
+        "http_max_connections": None,  # None keeps the SDK's default pool size
+        "http_keepalive": None,
+        "max_concurrency": 4,  # parallel requests for batch generation
+        "batch_poll_interval": 10,  # seconds between Anthropic batch status checks
+        "batch_timeout": 3600,  # seconds before an unfinished Anthropic batch is cancelled
     }
 
     def __init__(self):
         self.config_path = Path.home() / ".git-ai" / "config.yaml"
-        self.config = self._load_config()
+
+    @cached_property
+    def config(self) -> dict:
+        """Configuration values, read from disk on first access.
+
+        Deferring the read keeps the module-level ``config`` instance free,
+        so commands like ``--help`` never touch the config file.
+        """
+        return self._load_config()
 
     def _load_config(self) -> dict:
         """Load configuration from file or use defaults."""
         if self.config_path.exists():
-            with open(self.config_path, "r") as f:
-                user_config = yaml.safe_load(f)
-                return {**self.DEFAULT_CONFIG, **user_config}
+            return {**self.DEFAULT_CONFIG, **self._read_user_config()}
         return self.DEFAULT_CONFIG.copy()
 
+    def _read_user_config(self) -> dict:
+        """Parse the config file, reusing a cached copy while it is unchanged.
+
+        The parsed dict is stored as JSON next to the config together with
+        the file's mtime and size, so most runs skip YAML parsing entirely.
+        """
+        stat = self.config_path.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        cache_path = self.config_path.with_suffix(".yaml.cache")
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            if cached["stamp"] == stamp and isinstance(cached["config"], dict):
+                return cached["config"]
+        except (OSError, KeyError, TypeError, ValueError):
+            pass  # missing or unreadable cache, parse the YAML
+
+        import yaml
+
+        try:
+            loader = yaml.CSafeLoader  # libyaml C parser
+        except AttributeError:
+            loader = yaml.SafeLoader
+
+        with open(self.config_path, "r") as f:
+            user_config = yaml.load(f, Loader=loader) or {}
+
+        try:
+            data = json.dumps({"stamp": stamp, "config": user_config})
+            # Skip configs that JSON can't represent exactly (dates, int keys)
+            if json.loads(data)["config"] == user_config:
+                tmp_path = cache_path.with_suffix(".cache.tmp")
+                with open(tmp_path, "w") as f:
+                    f.write(data)
+                os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError):
+            pass  # caching is best effort
+        return user_config
+
     def save_config(self):
-        """Save current configuration to file."""
+        """Save current configuration to file.
+
+        Writes to a temporary file and renames it over the config, so an
+        interrupted save never leaves a truncated file behind.
+        """
+        import yaml
+
+        try:
+            dumper = yaml.CSafeDumper  # libyaml C emitter
+        except AttributeError:
+            dumper = yaml.SafeDumper
+
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.config_path, "w") as f:
-            yaml.dump(self.config, f, default_flow_style=False)
+        tmp_path = self.config_path.with_suffix(".yaml.tmp")
+        with open(tmp_path, "w") as f:
+            yaml.dump(self.config, f, Dumper=dumper, default_flow_style=False)
+        os.replace(tmp_path, self.config_path)
 
     def get(self, key: str, default=None):
         """Get configuration value."""
@@ -64,20 +148,33 @@ class Config:
 
     @property
     def provider(self) -> str:
-        """Get current LLM provider."""
-        return self.config["provider"]
+        """Get current LLM provider, honouring GIT_AI_PROVIDER if set."""
+        _ensure_env_loaded()  # GIT_AI_PROVIDER may come from .env
+        return os.environ.get(PROVIDER_ENV_VAR) or self.config["provider"]
 
     @property
     def model(self) -> str:
         """Get model for current provider."""
-        return self.config["model"][self.provider]
+        return self.get_model(self.provider)
 
     @property
     def api_key(self) -> Optional[str]:
         """Get API key for current provider."""
-        if self.provider == "anthropic":
+        return self.get_api_key(self.provider)
+
+    def get_model(self, provider: str) -> Optional[str]:
+        """Get model for a provider.
+
+        Falls back to the default for providers missing from a saved config.
+        """
+        return self.config["model"].get(provider) or self.DEFAULT_CONFIG["model"].get(provider)
+
+    def get_api_key(self, provider: str) -> Optional[str]:
+        """Get API key for a provider."""
+        _ensure_env_loaded()
+        if provider == "anthropic":
             return os.getenv("ANTHROPIC_API_KEY")
-        elif self.provider == "openai":
+        elif provider == "openai":
             return os.getenv("OPENAI_API_KEY")
         return None
 
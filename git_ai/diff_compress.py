@@ -0,0 +1,178 @@
+"""Compact diff representation for LLM prompts."""
+
+from typing import Iterable, Iterator, Optional, Tuple
+
+TRUNCATED_MARKER = "\n... (diff truncated)"
+
+Changes = list[tuple[list[str], list[str]]]
+
+
+def _parse_hunks(lines: Iterable[str], in_hunk: bool = False) -> Changes:
+    """Parse the hunks of one file into change blocks.
+
+    Args:
+        lines: Lines of a single file's patch.
+        in_hunk: Whether the lines start inside a hunk (no file headers).
+
+    Returns:
+        List of (removed, added) line-list pairs. Context lines, hunk headers
+        and file headers are dropped.
+    """
+    changes = []
+    current = None
+
+    for line in lines:
+        if line.startswith("@@"):
+            current = None
+            in_hunk = True
+        elif not in_hunk:
+            continue  # index, mode and ---/+++ header lines
+        elif line[:1] in ("-", "+"):
+            # Removals after additions start a new change
+            if current is None or (line[0] == "-" and current[1]):
+                current = ([], [])
+                changes.append(current)
+            (current[0] if line[0] == "-" else current[1]).append(line[1:])
+        else:
+            current = None  # context line ends the current change
+
+    return changes
+
+
+def _split_files(diff: str) -> Iterator[Tuple[str, list[str]]]:
+    """Split a unified diff into (path, lines) per file."""
+    path = None
+    lines = []
+    for line in diff.split("\n"):
+        if line.startswith("diff --git "):
+            if path is not None:
+                yield path, lines
+            path = line.rsplit(" b/", 1)[-1]
+            lines = []
+        elif path is not None:
+            lines.append(line)
+    if path is not None:
+        yield path, lines
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Cut text so that it fits ``budget`` characters including TRUNCATED_MARKER."""
+    return text[:max(budget - len(TRUNCATED_MARKER), 0)] + TRUNCATED_MARKER
+
+
+def _clip(lines: list[str], keep: Optional[int]) -> list[str]:
+    """Keep the first and last ``keep`` lines of a block."""
+    if keep is None or len(lines) <= 2 * keep:
+        return lines
+    return lines[:keep] + ["..."] + lines[-keep:]
+
+
+def _render(path: str, changes: Changes, keep: Optional[int] = None) -> str:
+    """Render one file's changes in the compact <FILE>/<REMOVED>/<ADDED> form."""
+    parts = [f"<FILE>{path}</FILE>\n"]
+    for removed, added in changes:
+        if removed:
+            parts.append("<REMOVED>\n" + "\n".join(_clip(removed, keep)) + "\n</REMOVED>\n")
+        if added:
+            parts.append("<ADDED>\n" + "\n".join(_clip(added, keep)) + "\n</ADDED>\n")
+    return "".join(parts)
+
+
+def _fit(path: str, changes: Changes, budget: int) -> str:
+    """Render a file, clipping its blocks until it fits ``budget`` characters."""
+    keep = max((max(len(r), len(a)) for r, a in changes), default=0)
+    rendered = _render(path, changes)
+    while keep > 1 and len(rendered) > budget:
+        keep //= 2
+        rendered = _render(path, changes, keep)
+    return rendered
+
+
+def _compress_files(files: Iterable[Tuple[str, Changes]], budget: int) -> str:
+    """Render parsed files, stopping once ``budget`` characters are filled."""
+    parsed = []
+    total = 0
+    for path, changes in files:
+        size = len(_render(path, changes))
+        parsed.append((path, changes, size))
+        total += size
+        if total > budget:
+            break  # later files are never read
+
+    if total <= budget:
+        return "".join(_render(path, changes) for path, changes, _ in parsed)
+
+    # Leave room for the marker so the result stays within budget
+    available = max(budget - len(TRUNCATED_MARKER), 0)
+    result = "".join(
+        _fit(path, changes, available * size // total)
+        for path, changes, size in parsed
+    )
+    return _truncate(result, budget)
+
+
+def compress_patches(patches: Iterable[Tuple[str, str, bytes]], budget: int) -> str:
+    """Compress per-file patches to at most ``budget`` characters.
+
+    Patches are consumed lazily, so a generator such as
+    ``GitRepo.iter_staged_patches()`` is only read until the budget is full.
+
+    Args:
+        patches: Iterable of (path, change_type, patch) tuples.
+        budget: Maximum length of the result in characters.
+
+    Returns:
+        Compressed diff text.
+    """
+    files = (
+        (path, _parse_hunks(patch.decode("utf-8", "replace").split("\n"), in_hunk=True))
+        for path, _, patch in patches
+    )
+    return _compress_files(files, budget)
+
+
+def strip_context(diff: str) -> str:
+    """Drop unchanged context lines from the hunks of a unified diff.
+
+    Hunk headers and changed lines are kept. Text outside hunks, including
+    already compressed output, is returned unchanged.
+
+    Args:
+        diff: Diff text.
+
+    Returns:
+        Diff text without context lines.
+    """
+    kept = []
+    in_hunk = False
+    for line in diff.split("\n"):
+        if line.startswith("diff --git "):
+            in_hunk = False
+        elif line.startswith("@@"):
+            in_hunk = True
+        elif in_hunk and line.startswith(" "):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def compress(diff: str, budget: int) -> str:
+    """Compress a unified diff to at most ``budget`` characters.
+
+    Only added and removed lines are kept, grouped per file. If that is still
+    over budget, each file gets a share proportional to its size and long
+    blocks are reduced to their head and tail.
+
+    Args:
+        diff: Unified diff text.
+        budget: Maximum length of the result in characters.
+
+    Returns:
+        Compressed diff text.
+    """
+    if not diff.startswith("diff --git ") and "\ndiff --git " not in diff:
+        return diff if len(diff) <= budget else _truncate(diff, budget)
+
+    return _compress_files(
+        ((path, _parse_hunks(lines)) for path, lines in _split_files(diff)), budget
+    )
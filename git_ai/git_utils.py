@@ -1,9 +1,22 @@
 """Git operations and diff analysis."""
 
-from typing import Optional, Tuple
-import git
+import subprocess
+import threading
+from functools import cached_property
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
 from pathlib import Path
 
+from .config import config
+
+if TYPE_CHECKING:
+    import git
+    import pygit2
+
+
+# GitError messages, fixed so callers and tests can match on them
+NOT_A_REPO_ERROR = "Not a git repository"
+NO_STAGED_CHANGES_ERROR = "No staged changes found. Use 'git add' to stage changes."
+
 
 class GitError(Exception):
     """Custom exception for git-related errors."""
@@ -19,26 +32,172 @@ class GitRepo:
         Args:
             repo_path: Path to git repository. Defaults to current directory.
         """
+        # GitPython is slow to import, so only load it once a repo is needed
+        import git as _git
+
+        self._git = _git
         try:
-            self.repo = git.Repo(repo_path or Path.cwd(), search_parent_directories=True)
-        except git.InvalidGitRepositoryError:
-            raise GitError("Not a git repository")
+            repo = _git.Repo(repo_path or Path.cwd(), search_parent_directories=True)
+        except _git.InvalidGitRepositoryError:
+            raise GitError(NOT_A_REPO_ERROR)
+
+        self.working_dir = repo.working_dir
+        self._local = threading.local()
+        self._local.repo = repo
+        # Recent commits keyed by (head_sha, count); HEAD only moves on new commits
+        self._recent_commits: dict[tuple[str, int], list[dict]] = {}
+
+        # Optional libgit2 bindings (the "fast" extra) read diffs in-process
+        try:
+            import pygit2
+        except ImportError:
+            pygit2 = None
+        self._pygit2 = pygit2
+
+    @property
+    def repo(self) -> "git.Repo":
+        """GitPython repository for the calling thread.
+
+        ``git.Repo`` shares its persistent git processes and is not
+        thread-safe, so each thread lazily opens its own instance.
+        """
+        repo = getattr(self._local, "repo", None)
+        if repo is None:
+            repo = self._local.repo = self._git.Repo(self.working_dir)
+        return repo
+
+    @cached_property
+    def _staged_diff_index(self) -> "git.DiffIndex":
+        """Patch-level diff between HEAD and the index.
+
+        Computed once per instance and shared by every staged-change query;
+        invalidated by commit().
+        """
+        # R=True diffs HEAD -> index; without it additions show up as deletions
+        return self.repo.index.diff("HEAD", create_patch=True, R=True)
+
+    @cached_property
+    def _pygit2_diff(self) -> Optional["pygit2.Diff"]:
+        """libgit2 diff between HEAD and the index, or None without pygit2.
+
+        Unlike GitPython, this never forks a git process. Renames are
+        detected like git's, so both backends report the same changes.
+        Invalidated by commit().
+        """
+        if self._pygit2 is None:
+            return None
+        diff = self._pygit2.Repository(self.working_dir).diff("HEAD", cached=True)
+        diff.find_similar()
+        return diff
+
+    def _invalidate_staged_cache(self):
+        """Drop memoized staged-change data after the index or HEAD moves."""
+        self.__dict__.pop("_staged_diff_index", None)
+        self.__dict__.pop("_pygit2_diff", None)
+
+    def _staged_entries(self) -> list[Tuple[str, str]]:
+        """Get (path, change_type) for each staged file."""
+        if self._pygit2_diff is not None:
+            return [
+                (delta.new_file.path, delta.status_char())
+                for delta in self._pygit2_diff.deltas
+            ]
+        return [
+            (item.b_path or item.a_path, self._change_type(item))
+            for item in self._staged_diff_index
+        ]
 
-    def get_staged_diff(self) -> str:
+    @staticmethod
+    def _change_type(item: "git.Diff") -> str:
+        """Get the A/D/R/M change type of a diff item.
+
+        GitPython leaves ``change_type`` unset on patch diffs, so it is derived
+        from the item flags instead.
+        """
+        if item.new_file:
+            return "A"
+        if item.deleted_file:
+            return "D"
+        if item.renamed_file:
+            return "R"
+        return "M"
+
+    def iter_staged_patches(self) -> Iterator[Tuple[str, str, bytes]]:
+        """Iterate over staged changes one file at a time.
+
+        Yields:
+            Tuples of (path, change_type, patch) where patch holds the raw hunks.
+
+        Raises:
+            GitError: If no changes are staged.
+        """
+        if not self.has_staged_changes():
+            raise GitError(NO_STAGED_CHANGES_ERROR)
+
+        if self._pygit2_diff is not None:
+            for patch in self._pygit2_diff:
+                # Drop the file headers so only the hunks remain
+                data = patch.data
+                start = data.find(b"\n@@")
+                hunks = data[start + 1:] if start != -1 else b""
+                yield patch.delta.new_file.path, patch.delta.status_char(), hunks
+            return
+
+        for item in self._staged_diff_index:
+            yield item.b_path or item.a_path, self._change_type(item), item.diff
+
+    def get_staged_diff(self, max_bytes: Optional[int] = None) -> str:
         """Get diff of staged changes.
-        
+
+        Deprecated: use iter_staged_patches(), which lets callers stop
+        reading once they have enough of the diff.
+
+        Args:
+            max_bytes: Maximum number of bytes to read. Defaults to four times
+                max_diff_length, leaving headroom for the compressor.
+
         Returns:
             Diff string of staged changes.
             
         Raises:
             GitError: If no changes are staged.
         """
-        if not self.has_staged_changes():
-            raise GitError("No staged changes found. Use 'git add' to stage changes.")
+        if max_bytes is None:
+            max_bytes = int(config.get("max_diff_length", 4000)) * 4
 
-        # Get diff of staged changes
-        diff = self.repo.git.diff("--cached", "--no-color")
-        return diff
+        if self._pygit2_diff is not None:
+            # Counts deltas without rendering any patch
+            if len(self._pygit2_diff) == 0:
+                raise GitError(NO_STAGED_CHANGES_ERROR)
+            # Render patches one file at a time, stopping once we have enough
+            chunks = []
+            size = 0
+            for patch in self._pygit2_diff:
+                chunks.append(patch.data)
+                size += len(chunks[-1])
+                if size >= max_bytes:
+                    break
+            return b"".join(chunks)[:max_bytes].decode("utf-8", "replace")
+
+        # Read straight from the plumbing pipe and kill git once we have
+        # enough, rather than buffering the whole diff in memory. No output
+        # means nothing is staged, so has_staged_changes() (which builds every
+        # patch with GitPython) isn't needed.
+        git_exe = self._git.Git.GIT_PYTHON_GIT_EXECUTABLE or "git"
+        proc = subprocess.Popen(
+            [git_exe, "-C", self.working_dir, "diff-index", "--cached", "-p", "--no-color", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            data = proc.stdout.read(max_bytes)
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+        if not data:
+            raise GitError(NO_STAGED_CHANGES_ERROR)
+        return data.decode("utf-8", "replace")
 
     def get_staged_files(self) -> list[str]:
         """Get list of staged files.
@@ -46,7 +205,7 @@ class GitRepo:
         Returns:
             List of staged file paths.
         """
-        return [item.a_path for item in self.repo.index.diff("HEAD")]
+        return [path for path, _ in self._staged_entries()]
 
     def has_staged_changes(self) -> bool:
         """Check if there are staged changes.
@@ -54,7 +213,7 @@ class GitRepo:
         Returns:
             True if there are staged changes, False otherwise.
         """
-        return len(self.repo.index.diff("HEAD")) > 0
+        return len(self._staged_entries()) > 0
 
     def commit(self, message: str) -> str:
         """Create a commit with the given message.
@@ -66,6 +225,7 @@ class GitRepo:
             Commit hash.
         """
         commit = self.repo.index.commit(message)
+        self._invalidate_staged_cache()
         return commit.hexsha
 
     def get_commit_stats(self) -> Tuple[int, int]:
@@ -74,21 +234,21 @@ class GitRepo:
         Returns:
             Tuple of (files_changed, total_changes).
         """
-        diff = self.repo.index.diff("HEAD")
-        files_changed = len(diff)
-        
-        # Count insertions and deletions
-        diff_text = self.repo.git.diff("--cached", "--shortstat")
-        total_changes = 0
-        
-        if diff_text:
-            # Parse shortstat output: "2 files changed, 10 insertions(+), 3 deletions(-)"
-            parts = diff_text.split(",")
-            for part in parts[1:]:  # Skip files changed part
-                if "insertion" in part or "deletion" in part:
-                    num = int(part.strip().split()[0])
-                    total_changes += num
-        
+        if self._pygit2_diff is not None:
+            stats = self._pygit2_diff.stats
+            return stats.files_changed, stats.insertions + stats.deletions
+
+        files_changed = len(self._staged_diff_index)
+
+        # Count insertions and deletions from the cached patches. They hold
+        # only hunks (no ---/+++ file headers), so every +/- line is a change.
+        total_changes = sum(
+            1
+            for item in self._staged_diff_index
+            for line in item.diff.splitlines()
+            if line[:1] in (b"+", b"-")
+        )
+
         return files_changed, total_changes
 
     def get_diff_summary(self) -> dict:
@@ -97,8 +257,6 @@ class GitRepo:
         Returns:
             Dictionary with diff summary including files and change types.
         """
-        diff = self.repo.index.diff("HEAD")
-        
         summary = {
             "files_changed": [],
             "additions": 0,
@@ -106,10 +264,7 @@ class GitRepo:
             "modifications": 0,
         }
 
-        for item in diff:
-            change_type = item.change_type
-            file_path = item.a_path or item.b_path
-
+        for file_path, change_type in self._staged_entries():
             summary["files_changed"].append({
                 "path": file_path,
                 "type": change_type,
@@ -133,11 +288,26 @@ class GitRepo:
         Returns:
             List of commit dictionaries with message and hash.
         """
+        key = (self.repo.head.commit.hexsha, count)
+        if key not in self._recent_commits:
+            self._recent_commits[key] = self._read_recent_commits(*key)
+        return self._recent_commits[key]
+
+    def _read_recent_commits(self, head_sha: str, count: int) -> list[dict]:
+        """Walk recent commits from head_sha."""
+        # One `git log` call instead of loading each Commit object from the odb.
+        # Fields are separated by \x1f and records by \x1e, which cannot
+        # appear in commit messages.
+        raw = self.repo.git.log(f"-n{count}", "--pretty=format:%H%x1f%an%x1f%B%x1e", head_sha)
+
         commits = []
-        for commit in self.repo.iter_commits(max_count=count):
+        for record in raw.split("\x1e"):
+            if not record.strip():
+                continue
+            hexsha, author, message = record.lstrip("\n").split("\x1f", 2)
             commits.append({
-                "hash": commit.hexsha[:7],
-                "message": commit.message.strip(),
-                "author": commit.author.name,
+                "hash": hexsha[:7],
+                "message": message.strip(),
+                "author": author,
             })
         return commits
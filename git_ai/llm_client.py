@@ -1,9 +1,254 @@
 """LLM client for generating commit messages."""
 
-from typing import Optional
-import anthropic
-import openai
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import attrgetter
+from types import ModuleType
+from typing import Any, Callable, Iterator, Optional
+from .cache import response_cache
 from .config import config
+from .diff_compress import TRUNCATED_MARKER, strip_context
+
+SYSTEM_PROMPT = (
+    "You are an expert software engineer who writes clear, concise git commit "
+    "messages. Return ONLY the commit message, no explanations."
+)
+
+# Marks a content block as a reusable prompt prefix for Anthropic prompt caching
+_EPHEMERAL = {"type": "ephemeral"}
+
+VARIANTS_INSTRUCTION = """
+
+Generate {n} distinct alternative commit messages. Return ONLY a JSON array of
+{n} strings, one commit message per string, no explanations."""
+
+_GUIDE_CONVENTIONAL = """
+Format: <type>(<scope>): <subject>
+
+<body>
+
+Types: {commit_types}
+- Use feat: for new features
+- Use fix: for bug fixes
+- Use docs: for documentation
+- Use refactor: for code refactoring
+- Use test: for test changes
+- Use chore: for maintenance tasks
+
+Rules:
+1. Subject line max 50 chars, lowercase, no period
+2. Body wraps at 72 chars
+3. Explain WHAT and WHY, not HOW
+4. Use imperative mood ("add" not "added")
+"""
+
+_GUIDE_SEMANTIC = """
+Format: <emoji> <type>: <subject>
+
+Examples:
+✨ feat: add user authentication
+🐛 fix: resolve memory leak in worker
+📝 docs: update API documentation
+♻️ refactor: simplify database queries
+"""
+
+_GUIDE_SIMPLE = """
+Format: <subject>
+
+<body>
+
+Keep it simple and clear. Focus on what changed and why.
+"""
+
+_GUIDES = {
+    "conventional": _GUIDE_CONVENTIONAL,
+    "semantic": _GUIDE_SEMANTIC,
+    "simple": _GUIDE_SIMPLE,
+}
+
+
+@lru_cache(maxsize=4)
+def _system_prefix(style: str, commit_types: tuple[str, ...]) -> str:
+    """Build the system prompt for a style; unknown styles use the simple guide.
+
+    Args:
+        style: Commit message style.
+        commit_types: Allowed commit types (a tuple so the result can be cached).
+
+    Returns:
+        System prompt with the style's format guide.
+    """
+    guide = _GUIDES.get(style, _GUIDE_SIMPLE).format(commit_types=", ".join(commit_types))
+    return f"""{SYSTEM_PROMPT}
+{guide}
+Generate a clear, concise commit message. Return ONLY the commit message, no explanations."""
+
+
+# Rough characters-per-token ratio, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=4)
+def _encoding(model: str) -> Optional[Any]:
+    """Get the tiktoken encoding for a model, or None if it can't be loaded.
+
+    tiktoken downloads its BPE files on first use, so offline machines fall
+    back to estimating tokens from the length as well.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+OLLAMA_BASE_URL = "http://localhost:11434/v1"
+
+# Returned by the offline "mock" provider, for tests and CI
+MOCK_COMMIT_MESSAGE = "chore: mock commit"
+
+# SDK clients keyed by (provider, api_key, base_url). Each one owns an HTTP
+# connection pool, so sharing them keeps connections warm across LLMClients.
+_CLIENT_CACHE: dict[tuple, Any] = {}
+
+
+def _sdk(provider: str) -> ModuleType:
+    """Import the SDK for a provider.
+
+    The SDKs are slow to import, so only the configured one is loaded.
+    """
+    if provider == "anthropic":
+        import anthropic
+
+        return anthropic
+    # openai or ollama (OpenAI-compatible API)
+    import openai
+
+    return openai
+
+
+def _retry_policy() -> tuple[float, int]:
+    """Get (per-attempt timeout in seconds, number of retries) from config."""
+    timeout = float(config.get("request_timeout", 30))
+    retries = max(int(config.get("max_retries", 2)), 0)
+    return timeout, retries
+
+
+def _build_client(
+    provider: str,
+    api_key: Optional[str],
+    base_url: Optional[str] = None,
+    asynchronous: bool = False,
+) -> Any:
+    """Construct the SDK client for a provider.
+
+    The request timeout comes from ``request_timeout``. The HTTP connection
+    pool keeps the SDK's defaults unless ``http_max_connections`` or
+    ``http_keepalive`` is set.
+    """
+    sdk = _sdk(provider)
+    timeout = float(config.get("request_timeout", 30))
+    http_options = {"timeout": timeout}
+
+    max_connections = config.get("http_max_connections")
+    keepalive = config.get("http_keepalive")
+    if max_connections is not None or keepalive is not None:
+        # Same type as the SDK's default, so it matches the HTTP package the
+        # SDK was built on
+        default = sdk.DEFAULT_CONNECTION_LIMITS
+        http_options["limits"] = type(default)(
+            max_connections=int(
+                default.max_connections if max_connections is None else max_connections
+            ),
+            max_keepalive_connections=int(
+                default.max_keepalive_connections if keepalive is None else keepalive
+            ),
+        )
+
+    if provider == "anthropic":
+        if asynchronous:
+            client_cls, http_cls = sdk.AsyncAnthropic, sdk.DefaultAsyncHttpxClient
+        else:
+            client_cls, http_cls = sdk.Anthropic, sdk.DefaultHttpxClient
+        return client_cls(
+            api_key=api_key,
+            timeout=timeout,
+            http_client=http_cls(**http_options),
+        )
+
+    # openai or ollama (OpenAI-compatible API)
+    if asynchronous:
+        client_cls, http_cls = sdk.AsyncOpenAI, sdk.DefaultAsyncHttpxClient
+    else:
+        client_cls, http_cls = sdk.OpenAI, sdk.DefaultHttpxClient
+    return client_cls(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=timeout,
+        http_client=http_cls(**http_options),
+    )
+
+
+def _edit_subject(message: str, edit: Callable[[str], str]) -> str:
+    """Apply ``edit`` to the subject line of a commit message."""
+    subject, newline, body = message.partition("\n")
+    return edit(subject) + newline + body
+
+
+# Mechanical refinements applied without calling the LLM. A rule is used
+# only when the pattern matches the whole feedback.
+_LOCAL_REFINE_RULES: list[tuple[re.Pattern, Callable[[str], str]]] = [
+    (
+        re.compile(r"(make it |use )?lower ?case( it| the subject)?", re.I),
+        lambda message: _edit_subject(message, str.lower),
+    ),
+    (
+        re.compile(r"(remove|drop|no)( the)?( trailing)? period", re.I),
+        lambda message: _edit_subject(message, lambda subject: subject.rstrip(".")),
+    ),
+    (
+        re.compile(r"(make it )?(shorter|one line|subject only|(remove|drop)( the)? body)", re.I),
+        lambda message: message.partition("\n")[0],
+    ),
+]
+
+
+def _refine_locally(message: str, feedback: str) -> Optional[str]:
+    """Apply a mechanical refinement without calling the LLM.
+
+    Args:
+        message: Commit message to refine.
+        feedback: User feedback.
+
+    Returns:
+        Refined message, or None if no rule matches the feedback or the
+        matching rule leaves the message unchanged.
+    """
+    feedback = feedback.strip().rstrip(".!")
+    for pattern, rule in _LOCAL_REFINE_RULES:
+        if pattern.fullmatch(feedback):
+            refined = rule(message)
+            return refined if refined != message else None
+    return None
+
+
+def _parse_variants(text: str) -> list[str]:
+    """Parse a JSON array of messages, tolerating surrounding prose or fences."""
+    try:
+        variants = json.loads(text[text.index("["):text.rindex("]") + 1])
+        return [str(v).strip() for v in variants]
+    except ValueError:
+        return [text]
 
 
 class LLMClient:
@@ -13,24 +258,97 @@ class LLMClient:
         """Initialize LLM client.
         
         Args:
-            provider: LLM provider (anthropic, openai, ollama). Defaults to config.
+            provider: LLM provider (anthropic, openai, ollama, mock). Defaults to config.
         """
+        # Read once: config.provider can change when .env is first loaded
         self.provider = provider or config.provider
-        self.model = config.model
+        self.model = config.get_model(self.provider)
+        # Prompt-cache hits reported by the last Anthropic response
+        self.cache_read_tokens = 0
+        # Whether the last generate_commit_message() came from the response cache
+        self.cache_hit = False
+        # (system_prefix, prompt) of the last generation, replayed by refine_message
+        self._last_context = None
+        # (event loop, async SDK client) of the last ``a*`` call
+        self._aclient = None
 
-        if self.provider == "anthropic":
-            self.client = anthropic.Anthropic(api_key=config.api_key)
-        elif self.provider == "openai":
-            self.client = openai.OpenAI(api_key=config.api_key)
+        if self.provider in ("anthropic", "openai"):
+            api_key, base_url = config.get_api_key(self.provider), None
         elif self.provider == "ollama":
             # Ollama runs locally, no API key needed
-            self.client = openai.OpenAI(
-                base_url="http://localhost:11434/v1",
-                api_key="ollama"  # Dummy key for Ollama
-            )
+            api_key, base_url = "ollama", OLLAMA_BASE_URL  # Dummy key for Ollama
+        elif self.provider == "mock":
+            # No SDK import, network access or API key
+            api_key, base_url = None, None
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
+        self._client_key = (self.provider, api_key, base_url)
+        self.client = None
+        if self.provider != "mock":
+            self.client = _CLIENT_CACHE.get(self._client_key) or _CLIENT_CACHE.setdefault(
+                self._client_key, _build_client(*self._client_key)
+            )
+        # Resolve the provider once instead of branching on every request
+        self._generate, self._agenerate, self._stream, self._variants = {
+            "anthropic": (
+                self._generate_anthropic,
+                self._agenerate_anthropic,
+                self._stream_anthropic,
+                self._variants_anthropic,
+            ),
+            "mock": (
+                self._generate_mock,
+                self._agenerate_mock,
+                self._stream_mock,
+                self._variants_mock,
+            ),
+        }.get(self.provider, (
+            self._generate_openai,
+            self._agenerate_openai,
+            self._stream_openai,
+            self._complete_openai,
+        ))
+
+    @property
+    def aclient(self) -> Any:
+        """Async SDK client for the running event loop, built on first use.
+
+        An async connection pool is bound to the event loop it was first
+        used on, so the client is rebuilt when called from another loop,
+        e.g. by a second ``asyncio.run()``. For the same reason it is not
+        shared through the client cache.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient[0] is not loop:
+            self._aclient = (loop, _build_client(*self._client_key, asynchronous=True))
+        return self._aclient[1]
+
+    def _call(self, endpoint: str, request: dict) -> Any:
+        """Call an SDK endpoint with the configured timeout and retries.
+
+        Each attempt is bounded by ``request_timeout``. Failed attempts are
+        retried up to ``max_retries`` times by the SDK, which backs off
+        between attempts and retries timeouts, connection errors, rate
+        limits and server errors.
+
+        Args:
+            endpoint: Dotted endpoint path, e.g. ``"messages.create"``.
+            request: Keyword arguments for the endpoint.
+
+        Returns:
+            The SDK response.
+        """
+        timeout, retries = _retry_policy()
+        client = self.client.with_options(timeout=timeout, max_retries=retries)
+        return attrgetter(endpoint)(client)(**request)
+
+    async def _acall(self, endpoint: str, request: dict) -> Any:
+        """Async version of _call()."""
+        timeout, retries = _retry_policy()
+        client = self.aclient.with_options(timeout=timeout, max_retries=retries)
+        return await attrgetter(endpoint)(client)(**request)
+
     def generate_commit_message(
         self,
         diff: str,
@@ -39,6 +357,102 @@ class LLMClient:
         style: str = "conventional",
     ) -> str:
         """Generate commit message from git diff.
+
+        Messages are cached on disk by prompt, so an identical request is
+        answered without calling the provider unless ``cache_enabled`` is off.
+        
+        Args:
+            diff: Git diff text.
+            diff_summary: Structured summary of changes.
+            recent_commits: Recent commit messages for context.
+            style: Commit message style (conventional, semantic, simple).
+            
+        Returns:
+            Generated commit message.
+        """
+        system_prefix, prompt = self._prepare_prompt(
+            diff, diff_summary, recent_commits, style
+        )
+        cache_key, message = self._cached(system_prefix, prompt)
+        if message is not None:
+            return message
+
+        message = self._generate(prompt, system=system_prefix)
+
+        if cache_key:
+            response_cache.put(cache_key, message)
+        return message
+
+    def stream_commit_message(
+        self,
+        diff: str,
+        diff_summary: dict,
+        recent_commits: list[dict],
+        style: str = "conventional",
+    ) -> Iterator[str]:
+        """Generate a commit message, yielding text as it arrives.
+
+        A cached message is yielded in one piece; otherwise the streamed
+        message is cached once complete, unless it came back empty.
+        
+        Args:
+            diff: Git diff text.
+            diff_summary: Structured summary of changes.
+            recent_commits: Recent commit messages for context.
+            style: Commit message style (conventional, semantic, simple).
+            
+        Yields:
+            Chunks of the commit message.
+        """
+        system_prefix, prompt = self._prepare_prompt(
+            diff, diff_summary, recent_commits, style
+        )
+        cache_key, message = self._cached(system_prefix, prompt)
+        if message is not None:
+            yield message
+            return
+
+        chunks = []
+        for text in self._stream(prompt, system=system_prefix):
+            chunks.append(text)
+            yield text
+
+        message = "".join(chunks).strip()
+        if cache_key and message:
+            response_cache.put(cache_key, message)
+
+    def _cache_key(self, system_prefix: str, prompt: str) -> Optional[str]:
+        """Get the response cache key for a prompt, or None if caching is off."""
+        # Mock messages must never be served as real ones later
+        if not config.get("cache_enabled", True) or self.provider == "mock":
+            return None
+        return response_cache.make_key(self.provider, self.model, system_prefix, prompt)
+
+    def _cached(self, system_prefix: str, prompt: str) -> tuple[Optional[str], Optional[str]]:
+        """Look up a prompt in the response cache.
+
+        Also records the prompt for refine_message() and sets ``cache_hit``.
+
+        Returns:
+            Tuple of (cache_key, message). The key is None if caching is off,
+            the message None on a miss.
+        """
+        self._last_context = (system_prefix, prompt)
+        cache_key = self._cache_key(system_prefix, prompt)
+        message = response_cache.get(cache_key) if cache_key else None
+        self.cache_hit = message is not None
+        return cache_key, message
+
+    async def agenerate_commit_message(
+        self,
+        diff: str,
+        diff_summary: dict,
+        recent_commits: list[dict],
+        style: str = "conventional",
+    ) -> str:
+        """Async version of generate_commit_message().
+
+        Several diffs can be processed concurrently with ``asyncio.gather``.
         
         Args:
             diff: Git diff text.
@@ -49,17 +463,178 @@ class LLMClient:
         Returns:
             Generated commit message.
         """
-        # Truncate diff if too long
-        max_length = config.get("max_diff_length", 4000)
-        if len(diff) > max_length:
-            diff = diff[:max_length] + "\n... (diff truncated)"
+        system_prefix, prompt = self._prepare_prompt(
+            diff, diff_summary, recent_commits, style
+        )
+        cache_key, message = self._cached(system_prefix, prompt)
+        if message is not None:
+            return message
+
+        message = await self._agenerate(prompt, system=system_prefix)
+
+        if cache_key:
+            response_cache.put(cache_key, message)
+        return message
+
+    def generate_commit_messages_batch(
+        self,
+        items: list[tuple[str, dict, list[dict], str]],
+    ) -> list[str]:
+        """Generate commit messages for several diffs at once.
+
+        Messages in the response cache are reused; only the rest are sent to
+        the provider, and their results are cached.
+        
+        Args:
+            items: (diff, diff_summary, recent_commits, style) tuples.
+            
+        Returns:
+            Generated commit messages, in the order of ``items``.
+
+        Raises:
+            RuntimeError: If a request in an Anthropic batch did not succeed.
+            TimeoutError: If an Anthropic batch did not end within ``batch_timeout``.
+        """
+        prompts = [self._prepare_prompt(*item) for item in items]
+        cache_keys = [self._cache_key(*p) for p in prompts]
+        messages = [response_cache.get(key) if key else None for key in cache_keys]
+
+        missing = [i for i, message in enumerate(messages) if message is None]
+        if missing:
+            generated = self._generate_batch([prompts[i] for i in missing])
+            for i, message in zip(missing, generated):
+                messages[i] = message
+                if cache_keys[i]:
+                    response_cache.put(cache_keys[i], message)
+        return messages
+
+    def _generate_batch(self, prompts: list[tuple[str, str]]) -> list[str]:
+        """Generate messages for several (system_prefix, prompt) pairs.
+
+        OpenAI-compatible providers send the requests concurrently, up to
+        ``max_concurrency`` at a time. Anthropic submits them as one Message
+        Batch and polls every ``batch_poll_interval`` seconds until it ends;
+        a batch still running after ``batch_timeout`` seconds is cancelled.
+
+        Raises:
+            RuntimeError: If a request in an Anthropic batch did not succeed.
+            TimeoutError: If the Anthropic batch did not end in time.
+        """
+        if self.provider != "anthropic":  # openai, ollama or mock
+            workers = max(int(config.get("max_concurrency", 4)), 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(
+                    lambda p: self._generate(p[1], system=p[0]), prompts
+                ))
+
+        batch = self._call("messages.batches.create", {
+            "requests": [
+                {
+                    "custom_id": str(i),
+                    "params": self._anthropic_request(prompt, system=system_prefix),
+                }
+                for i, (system_prefix, prompt) in enumerate(prompts)
+            ],
+        })
+        interval = float(config.get("batch_poll_interval", 10))
+        deadline = time.monotonic() + float(config.get("batch_timeout", 3600))
+        while batch.processing_status != "ended":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._call("messages.batches.cancel", {"message_batch_id": batch.id})
+                raise TimeoutError(f"Batch {batch.id} did not end within batch_timeout")
+            time.sleep(min(interval, remaining))
+            batch = self._call("messages.batches.retrieve", {"message_batch_id": batch.id})
+
+        messages = [None] * len(prompts)
+        for entry in self._call("messages.batches.results", {"message_batch_id": batch.id}):
+            if entry.result.type != "succeeded":
+                raise RuntimeError(
+                    f"Batch request {entry.custom_id} failed: {entry.result.type}"
+                )
+            messages[int(entry.custom_id)] = self._anthropic_text(entry.result.message)
+        return messages
+
+    def generate_variants(
+        self,
+        diff: str,
+        diff_summary: dict,
+        recent_commits: list[dict],
+        style: str = "conventional",
+        n: int = 3,
+    ) -> list[str]:
+        """Generate several alternative commit messages in one request.
+
+        Anthropic is asked for a JSON array of messages; OpenAI-compatible
+        providers use the ``n`` parameter so all samples share one prefill.
+        
+        Args:
+            diff: Git diff text.
+            diff_summary: Structured summary of changes.
+            recent_commits: Recent commit messages for context.
+            style: Commit message style (conventional, semantic, simple).
+            n: Number of variants to request.
+            
+        Returns:
+            List of up to ``n`` commit messages.
+        """
+        system_prefix, prompt = self._prepare_prompt(
+            diff, diff_summary, recent_commits, style
+        )
+        # Sample a little hotter than the first message to get real variety
+        temperature = min(float(config.get("temperature", 0.3)) + 0.2, 1.0)
+
+        variants = self._variants(prompt, system=system_prefix, temperature=temperature, n=n)
+        return [v for v in variants if v][:n]
+
+    def _prepare_prompt(
+        self,
+        diff: str,
+        diff_summary: dict,
+        recent_commits: list[dict],
+        style: str,
+    ) -> tuple[str, str]:
+        """Truncate the diff and build the prompt.
+
+        Returns:
+            Tuple of (system_prefix, prompt), see _build_prompt().
+        """
+        diff = self._truncate_diff(diff)
+
+        return self._build_prompt(diff, diff_summary, recent_commits, style)
+
+    def _truncate_diff(self, diff: str) -> str:
+        """Cut the diff down to ``max_diff_tokens`` tokens.
+
+        Context lines of a unified diff are dropped first; the rest is only
+        sliced if that is still over the limit.
+
+        OpenAI models are measured with tiktoken when it is installed (the
+        ``tokens`` extra); otherwise tokens are estimated from the length.
+        ``max_diff_tokens`` defaults to ``max_diff_length`` in tokens.
+        """
+        max_tokens = config.get("max_diff_tokens") or (
+            int(config.get("max_diff_length", 4000)) // CHARS_PER_TOKEN
+        )
+        max_tokens = int(max_tokens)
 
-        prompt = self._build_prompt(diff, diff_summary, recent_commits, style)
+        # Over budget, context lines go first so fewer changes are cut
+        encoding = _encoding(self.model) if self.provider == "openai" else None
+        if encoding is None:
+            max_length = max_tokens * CHARS_PER_TOKEN
+            if len(diff) > max_length:
+                diff = strip_context(diff)
+            if len(diff) > max_length:
+                diff = diff[:max_length] + TRUNCATED_MARKER
+            return diff
 
-        if self.provider == "anthropic":
-            return self._generate_anthropic(prompt)
-        else:  # openai or ollama
-            return self._generate_openai(prompt)
+        tokens = encoding.encode(diff, disallowed_special=())
+        if len(tokens) > max_tokens:
+            diff = strip_context(diff)
+            tokens = encoding.encode(diff, disallowed_special=())
+        if len(tokens) > max_tokens:
+            diff = encoding.decode(tokens[:max_tokens]) + TRUNCATED_MARKER
+        return diff
 
     def _build_prompt(
         self,
@@ -67,7 +642,7 @@ class LLMClient:
         diff_summary: dict,
         recent_commits: list[dict],
         style: str,
-    ) -> str:
+    ) -> tuple[str, str]:
         """Build prompt for LLM.
         
         Args:
@@ -77,105 +652,265 @@ class LLMClient:
             style: Commit message style.
             
         Returns:
-            Formatted prompt.
+            Tuple of (system_prefix, prompt). The system prefix holds the
+            instructions and format guide, which only depend on the style and
+            config, so providers can cache it; the prompt holds the changes.
         """
-        commit_types = ", ".join(config.commit_types)
-        
-        files_changed = "\n".join([
-            f"- {f['path']} ({f['type']})"
-            for f in diff_summary["files_changed"]
-        ])
+        # Collected in one list and joined once; this runs before every request
+        parts = ["Generate a git commit message for the following changes.\n\nFiles changed:"]
+        append = parts.append
+        for f in diff_summary["files_changed"]:
+            append("\n- ")
+            append(f["path"])
+            append(" (")
+            append(f["type"])
+            append(")")
+
+        append("\n\nSummary:\n- ")
+        append(str(diff_summary["additions"]))
+        append(" file(s) added\n- ")
+        append(str(diff_summary["modifications"]))
+        append(" file(s) modified\n- ")
+        append(str(diff_summary["deletions"]))
+        append(" file(s) deleted\n\nGit diff:\n```\n")
+        append(diff)
+        append("\n```")
 
-        recent_context = ""
         if recent_commits:
-            recent_context = "\n\nRecent commits for context:\n" + "\n".join([
-                f"- {c['hash']}: {c['message']}"
-                for c in recent_commits[:3]
-            ])
+            append("\n\n\nRecent commits for context:")
+            for c in recent_commits[:3]:
+                append("\n- ")
+                append(c["hash"])
+                append(": ")
+                append(c["message"])
 
-        if style == "conventional":
-            format_guide = f"""
-Format: <type>(<scope>): <subject>
+        system_prefix = _system_prefix(style, tuple(config.commit_types))
+        return system_prefix, "".join(parts)
 
-<body>
+    def _anthropic_request(
+        self,
+        prompt: str,
+        system: str = SYSTEM_PROMPT,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        history: Optional[tuple[str, str]] = None,
+    ) -> dict:
+        """Build the arguments for an Anthropic ``messages.create`` call.
 
-Types: {commit_types}
-- Use feat: for new features
-- Use fix: for bug fixes
-- Use docs: for documentation
-- Use refactor: for code refactoring
-- Use test: for test changes
-- Use chore: for maintenance tasks
+        ``max_tokens`` defaults to ``max_output_tokens``, which bounds the
+        worst-case decoding time of a response.
 
-Rules:
-1. Subject line max 50 chars, lowercase, no period
-2. Body wraps at 72 chars
-3. Explain WHAT and WHY, not HOW
-4. Use imperative mood ("add" not "added")
-"""
-        elif style == "semantic":
-            format_guide = """
-Format: <emoji> <type>: <subject>
+        ``system`` is marked with ``cache_control`` so repeated calls are
+        served from Anthropic's prompt cache. ``history`` is an earlier
+        (prompt, reply) exchange replayed before ``prompt``; its user turn is
+        cached too for follow-up requests.
+        """
+        messages = []
+        if history:
+            history_prompt, history_reply = history
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": history_prompt, "cache_control": _EPHEMERAL},
+                ],
+            })
+            messages.append({"role": "assistant", "content": history_reply})
+        messages.append({"role": "user", "content": prompt})
 
-Examples:
-✨ feat: add user authentication
-🐛 fix: resolve memory leak in worker
-📝 docs: update API documentation
-♻️ refactor: simplify database queries
-"""
-        else:  # simple
-            format_guide = """
-Format: <subject>
+        if temperature is None:
+            temperature = config.get("temperature", 0.3)
+        if max_tokens is None:
+            max_tokens = int(config.get("max_output_tokens", 200))
 
-<body>
+        return dict(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=[{"type": "text", "text": system, "cache_control": _EPHEMERAL}],
+            messages=messages
+        )
 
-Keep it simple and clear. Focus on what changed and why.
-"""
+    def _anthropic_text(self, response: Any) -> str:
+        """Extract the message from an Anthropic response, recording cache hits."""
+        self.cache_read_tokens = getattr(response.usage, "cache_read_input_tokens", 0) or 0
+        return response.content[0].text.strip()
 
-        prompt = f"""Generate a git commit message for the following changes.
+    def _generate_anthropic(self, prompt: str, **kwargs) -> str:
+        """Generate using Anthropic API.
 
-Files changed:
-{files_changed}
+        Keyword arguments are passed to _anthropic_request().
+        """
+        response = self._call("messages.create", self._anthropic_request(prompt, **kwargs))
+        return self._anthropic_text(response)
 
-Summary:
-- {diff_summary['additions']} file(s) added
-- {diff_summary['modifications']} file(s) modified
-- {diff_summary['deletions']} file(s) deleted
+    async def _agenerate_anthropic(self, prompt: str, **kwargs) -> str:
+        """Async version of _generate_anthropic()."""
+        response = await self._acall(
+            "messages.create", self._anthropic_request(prompt, **kwargs)
+        )
+        return self._anthropic_text(response)
 
-{format_guide}
+    def _stream_anthropic(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream a message from Anthropic API.
 
-Git diff:
-```
-{diff}
-```
-{recent_context}
+        Keyword arguments are passed to _anthropic_request().
+        """
+        timeout, retries = _retry_policy()
+        client = self.client.with_options(timeout=timeout, max_retries=retries)
+        with client.messages.stream(**self._anthropic_request(prompt, **kwargs)) as stream:
+            yield from stream.text_stream
 
-Generate a clear, concise commit message. Return ONLY the commit message, no explanations."""
+    def _variants_anthropic(self, prompt: str, n: int = 1, **kwargs) -> list[str]:
+        """Ask Anthropic API for a JSON array of ``n`` messages.
+
+        Keyword arguments are passed to _anthropic_request().
+        """
+        text = self._generate_anthropic(
+            prompt + VARIANTS_INSTRUCTION.format(n=n),
+            max_tokens=int(config.get("max_output_tokens", 200)) * n,
+            **kwargs,
+        )
+        return _parse_variants(text)
+
+    def _openai_request(
+        self,
+        prompt: str,
+        system: str = SYSTEM_PROMPT,
+        temperature: Optional[float] = None,
+        n: int = 1,
+        history: Optional[tuple[str, str]] = None,
+        max_tokens: Optional[int] = None,
+    ) -> dict:
+        """Build the arguments for an OpenAI ``chat.completions.create`` call.
+
+        ``system`` leads the request so the provider's automatic prefix cache
+        can reuse it. ``history`` is an earlier (prompt, reply) exchange
+        replayed verbatim, so it matches the cached prefix of that request.
+        Ollama ignores ``n`` and returns a single choice. ``max_tokens``
+        defaults to ``max_output_tokens``.
+        """
+        messages = [{"role": "system", "content": system}]
+        if history:
+            history_prompt, history_reply = history
+            messages.append({"role": "user", "content": history_prompt})
+            messages.append({"role": "assistant", "content": history_reply})
+        messages.append({"role": "user", "content": prompt})
 
-        return prompt
+        if temperature is None:
+            temperature = config.get("temperature", 0.3)
+        if max_tokens is None:
+            max_tokens = int(config.get("max_output_tokens", 200))
 
-    def _generate_anthropic(self, prompt: str) -> str:
-        """Generate using Anthropic API."""
-        response = self.client.messages.create(
+        return dict(
             model=self.model,
-            max_tokens=500,
-            temperature=config.get("temperature", 0.3),
-            messages=[{"role": "user", "content": prompt}]
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            n=n,
         )
-        return response.content[0].text.strip()
 
-    def _generate_openai(self, prompt: str) -> str:
-        """Generate using OpenAI API or Ollama."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,
-            temperature=config.get("temperature", 0.3),
+    @staticmethod
+    def _openai_texts(response: Any) -> list[str]:
+        """Extract the messages from an OpenAI response."""
+        return [choice.message.content.strip() for choice in response.choices]
+
+    def _generate_openai(self, prompt: str, **kwargs) -> str:
+        """Generate using OpenAI API or Ollama.
+
+        Keyword arguments are passed to _openai_request().
+        """
+        return self._complete_openai(prompt, **kwargs)[0]
+
+    def _complete_openai(self, prompt: str, **kwargs) -> list[str]:
+        """Request completions from OpenAI API or Ollama.
+
+        Keyword arguments are passed to _openai_request().
+        """
+        response = self._call(
+            "chat.completions.create", self._openai_request(prompt, **kwargs)
         )
-        return response.choices[0].message.content.strip()
+        return self._openai_texts(response)
+
+    async def _agenerate_openai(self, prompt: str, **kwargs) -> str:
+        """Async version of _generate_openai()."""
+        response = await self._acall(
+            "chat.completions.create", self._openai_request(prompt, **kwargs)
+        )
+        return self._openai_texts(response)[0]
+
+    def _stream_openai(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream a message from OpenAI API or Ollama.
+
+        Keyword arguments are passed to _openai_request().
+        """
+        timeout, retries = _retry_policy()
+        client = self.client.with_options(timeout=timeout, max_retries=retries)
+        request = self._openai_request(prompt, **kwargs)
+        for chunk in client.chat.completions.create(**request, stream=True):
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+    def _generate_mock(self, prompt: str, **kwargs) -> str:
+        """Return MOCK_COMMIT_MESSAGE without calling any provider.
+
+        Accepts the same arguments as the other _generate_* methods, and so
+        do the other _*_mock methods.
+        """
+        return MOCK_COMMIT_MESSAGE
+
+    async def _agenerate_mock(self, prompt: str, **kwargs) -> str:
+        """Async version of _generate_mock()."""
+        return MOCK_COMMIT_MESSAGE
+
+    def _stream_mock(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield MOCK_COMMIT_MESSAGE in one piece."""
+        yield MOCK_COMMIT_MESSAGE
+
+    def _variants_mock(self, prompt: str, **kwargs) -> list[str]:
+        """Return MOCK_COMMIT_MESSAGE as the only variant."""
+        return [MOCK_COMMIT_MESSAGE]
+
+    def _refine_request(self, original: str, feedback: str) -> tuple[str, dict]:
+        """Build the refinement prompt and its request options.
+
+        Returns:
+            Tuple of (prompt, options), where options holds the system
+            prompt, replayed history and ``refine_max_tokens`` cap.
+        """
+        system, history = SYSTEM_PROMPT, None
+        if self._last_context:
+            system, last_prompt = self._last_context
+            history = (last_prompt, original)
+            prompt = f"""Refine the commit message above based on this feedback:
+{feedback}
+
+Generate the refined commit message. Return ONLY the commit message, no explanations."""
+        else:
+            prompt = f"""Refine this commit message based on the feedback.
+
+Original message:
+{original}
+
+Feedback:
+{feedback}
+
+Generate the refined commit message. Return ONLY the commit message, no explanations."""
+        options = {
+            "system": system,
+            "history": history,
+            "max_tokens": int(config.get("refine_max_tokens", 150)),
+        }
+        return prompt, options
 
     def refine_message(self, original: str, feedback: str) -> str:
         """Refine commit message based on user feedback.
+
+        Mechanical feedback such as "lowercase" or "no period" is applied
+        locally. Otherwise, after generate_commit_message(), the original
+        request is replayed as conversation history so the provider can serve
+        the system prompt and diff from its prompt cache instead of
+        re-processing them.
         
         Args:
             original: Original commit message.
@@ -184,17 +919,28 @@ Generate a clear, concise commit message. Return ONLY the commit message, no exp
         Returns:
             Refined commit message.
         """
-        prompt = f"""Refine this commit message based on the feedback.
+        refined = _refine_locally(original, feedback)
+        if refined is not None:
+            return refined
 
-Original message:
-{original}
+        prompt, options = self._refine_request(original, feedback)
 
-Feedback:
-{feedback}
+        return self._generate(prompt, **options)
 
-Generate the refined commit message. Return ONLY the commit message, no explanations."""
+    async def arefine_message(self, original: str, feedback: str) -> str:
+        """Async version of refine_message().
+        
+        Args:
+            original: Original commit message.
+            feedback: User feedback for refinement.
+            
+        Returns:
+            Refined commit message.
+        """
+        refined = _refine_locally(original, feedback)
+        if refined is not None:
+            return refined
 
-        if self.provider == "anthropic":
-            return self._generate_anthropic(prompt)
-        else:
-            return self._generate_openai(prompt)
+        prompt, options = self._refine_request(original, feedback)
+
+        return await self._agenerate(prompt, **options)
@@ -0,0 +1,50 @@
+"""Shared pytest fixtures."""
+
+import shutil
+import pytest
+import git
+
+
+@pytest.fixture(scope="session")
+def _repo_template(tmp_path_factory):
+    """Build a repository with test.txt in an initial commit, once per session.
+
+    Built in-process with pygit2 when it is installed rather than through
+    GitPython, which spawns git for each step.
+    """
+    template = tmp_path_factory.mktemp("repo_template")
+    test_file = template / "test.txt"
+
+    try:
+        import pygit2
+    except ImportError:
+        repo = git.Repo.init(template)
+        test_file.write_text("initial content\n")
+        repo.index.add(["test.txt"])
+        repo.index.commit("Initial commit")
+        return template
+
+    repo = pygit2.init_repository(str(template))
+    test_file.write_text("initial content\n")
+    repo.index.add("test.txt")
+    repo.index.write()
+    tree = repo.index.write_tree()
+    signature = pygit2.Signature("Test", "test@example.com")
+    repo.create_commit("HEAD", signature, signature, "Initial commit", tree, [])
+
+    return template
+
+
+@pytest.fixture
+def initialized_repo(tmp_path, _repo_template):
+    """Copy the template repository into the test's tmp_path.
+
+    Copying a few files is much cheaper than running git init and commit
+    for every test.
+
+    Returns:
+        Tuple of (repo_path, repo).
+    """
+    repo_path = tmp_path / "test_repo"
+    shutil.copytree(_repo_template, repo_path)
+    return repo_path, git.Repo(repo_path)
@@ -0,0 +1,90 @@
+"""Tests for cache module."""
+
+import sqlite3
+
+import pytest
+
+from git_ai import cache as cache_module
+from git_ai.cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """ResponseCache backed by a database in tmp_path."""
+    return ResponseCache(tmp_path / "cache" / "llm_cache.sqlite")
+
+
+class TestResponseCache:
+    """Test ResponseCache class."""
+
+    def test_put_and_get(self, cache):
+        """Test that a stored value is returned for its key."""
+        key = ResponseCache.make_key("anthropic", "model", "prompt")
+        cache.put(key, "feat: add cache")
+
+        assert cache.get(key) == "feat: add cache"
+        assert cache.get(ResponseCache.make_key("anthropic", "model", "other")) is None
+
+    def test_put_replaces(self, cache):
+        """Test that storing an existing key replaces its value."""
+        cache.put("key", "first")
+        cache.put("key", "second")
+
+        assert cache.get("key") == "second"
+
+    def test_expired_entry(self, cache):
+        """Test that entries past their TTL are not returned."""
+        cache.put("key", "stale", ttl=-1)
+
+        assert cache.get("key") is None
+
+    def test_put_drops_expired(self, cache):
+        """Test that writes remove entries past their TTL."""
+        cache.put("stale", "old", ttl=-1)
+        cache.put("key", "new")
+
+        with sqlite3.connect(cache.cache_path) as conn:
+            assert conn.execute("SELECT key FROM kv").fetchall() == [("key",)]
+
+    def test_locked_database(self, cache, monkeypatch):
+        """Test that a database locked by another process is a miss, not an error."""
+        monkeypatch.setattr(cache_module, "LOCK_TIMEOUT", 0)
+        cache.put("key", "cached")
+        lock = sqlite3.connect(cache.cache_path, isolation_level=None)
+        lock.execute("BEGIN EXCLUSIVE")
+        try:
+            assert cache.get("key") is None
+            cache.put("key", "skipped")
+        finally:
+            lock.close()
+
+        assert cache.get("key") == "cached"
+
+    def test_corrupt_database(self, cache):
+        """Test that an unreadable database is a miss and writes are skipped."""
+        cache.cache_path.parent.mkdir()
+        cache.cache_path.write_bytes(b"not a database" * 100)
+
+        cache.put("key", "value")
+        assert cache.get("key") is None
+
+    def test_missing_database(self, cache):
+        """Test that reads don't create the database file."""
+        assert cache.get("key") is None
+        assert cache.clear() == 0
+        assert not cache.cache_path.exists()
+
+    def test_clear(self, cache):
+        """Test that clear removes every entry and returns the count."""
+        cache.put("a", "1")
+        cache.put("b", "2")
+
+        assert cache.clear() == 2
+        assert cache.get("a") is None
+        assert cache.clear() == 0
+
+    def test_make_key(self):
+        """Test that keys are stable and separate their parts."""
+        assert ResponseCache.make_key("a", "b") == ResponseCache.make_key("a", "b")
+        assert ResponseCache.make_key("ab", "") != ResponseCache.make_key("a", "b")
+        assert len(ResponseCache.make_key("a")) == 32
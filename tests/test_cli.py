@@ -0,0 +1,89 @@
+"""Tests for cli module."""
+
+from concurrent.futures import Future
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from git_ai import cli as cli_module
+from git_ai.cli import _interactive_edit, cli
+from git_ai.config import config
+
+
+@pytest.fixture
+def choices(monkeypatch):
+    """Answer the interactive prompts from a list, in order."""
+    answers = []
+    monkeypatch.setattr(cli_module.Prompt, "ask", lambda *args, **kwargs: answers.pop(0))
+    return answers
+
+
+def resolved(value) -> Future:
+    """Future that already holds value."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class TestConfigSet:
+    """Test the config-set command."""
+
+    @pytest.fixture(autouse=True)
+    def config_path(self, tmp_path, monkeypatch):
+        """Save the config to tmp_path and restore the values afterwards."""
+        monkeypatch.setattr(config, "config_path", tmp_path / "config.yaml")
+        for key in ("prefetch_variants", "temperature"):
+            monkeypatch.setitem(config.config, key, config.config[key])
+        monkeypatch.setitem(config.config, "model", dict(config.config["model"]))
+        return config.config_path
+
+    def test_parses_values(self, config_path):
+        """Test that booleans and numbers are not stored as strings."""
+        runner = CliRunner()
+        runner.invoke(cli, ["config-set", "prefetch_variants", "false"])
+        runner.invoke(cli, ["config-set", "temperature", "0.5"])
+
+        assert config.get("prefetch_variants") is False
+        assert config.get("temperature") == 0.5
+        saved = yaml.safe_load(config_path.read_text())
+        assert saved["prefetch_variants"] is False
+
+    def test_nested_key(self):
+        """Test that strings are kept as they are."""
+        CliRunner().invoke(cli, ["config-set", "model.openai", "gpt-4o"])
+
+        assert config.get("model")["openai"] == "gpt-4o"
+
+
+class TestInteractiveEdit:
+    """Test _interactive_edit function."""
+
+    def test_regenerate_cycles_variants(self, choices):
+        """Test that "r" cycles through the variants and back to the original."""
+        variants = resolved(["second", "first", "third"])
+        choices.extend(["r", "r", "r", "r", "a"])
+
+        assert _interactive_edit("first", None, True, variants) == "second"
+
+    def test_regenerate_fetches_on_demand(self, choices):
+        """Test that variants are fetched on the first "r" when not prefetched."""
+        calls = []
+
+        def fetch_variants():
+            calls.append(1)
+            return ["second"]
+
+        choices.extend(["a"])
+        assert _interactive_edit("first", None, True, None, fetch_variants) == "first"
+        assert calls == []
+
+        choices.extend(["r", "r", "r", "a"])
+        assert _interactive_edit("first", None, True, None, fetch_variants) == "second"
+        assert calls == [1]
+
+    def test_regenerate_disabled(self, choices):
+        """Test that "r" keeps the message when prefetching is off."""
+        choices.extend(["r", "a"])
+
+        assert _interactive_edit("first", None, True) == "first"
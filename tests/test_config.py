@@ -0,0 +1,57 @@
+"""Tests for config module."""
+
+import json
+import os
+
+import pytest
+import yaml
+
+from git_ai.config import Config
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Path of a config file with a custom temperature."""
+    path = tmp_path / "config.yaml"
+    path.write_text("temperature: 0.5\n")
+    return path
+
+
+def load(config_path):
+    """Load a fresh Config from config_path."""
+    config = Config()
+    config.config_path = config_path
+    return config.config
+
+
+class TestUserConfigCache:
+    """Test the parsed config cache."""
+
+    def test_cache_hit(self, config_path, monkeypatch):
+        """Test that an unchanged config is read from the cache."""
+        assert load(config_path)["temperature"] == 0.5
+        assert config_path.with_suffix(".yaml.cache").exists()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("YAML parsed despite a fresh cache")
+
+        monkeypatch.setattr(yaml, "load", fail)
+        assert load(config_path)["temperature"] == 0.5
+
+    def test_size_change_invalidates(self, config_path):
+        """Test that a rewrite keeping the mtime is still picked up."""
+        load(config_path)
+        stat = config_path.stat()
+
+        config_path.write_text("temperature: 0.75\n")
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert load(config_path)["temperature"] == 0.75
+
+    def test_corrupt_cache_falls_back(self, config_path):
+        """Test that an unreadable cache is ignored and rewritten."""
+        cache_path = config_path.with_suffix(".yaml.cache")
+        cache_path.write_bytes(b"\x80not json")
+
+        assert load(config_path)["temperature"] == 0.5
+        assert json.loads(cache_path.read_bytes())["config"] == {"temperature": 0.5}
@@ -0,0 +1,106 @@
+"""Tests for diff_compress module."""
+
+from git_ai.diff_compress import compress, compress_patches, strip_context, TRUNCATED_MARKER
+
+
+DIFF = """diff --git a/app.py b/app.py
+index 1234567..89abcde 100644
+--- a/app.py
++++ b/app.py
+@@ -1,4 +1,4 @@
+ import os
+-def old():
++def new():
+     pass
+@@ -10,2 +10,3 @@ def main():
+     run()
++    cleanup()
+diff --git a/new.txt b/new.txt
+new file mode 100644
+--- /dev/null
++++ b/new.txt
+@@ -0,0 +1 @@
++hello
+"""
+
+
+class TestCompress:
+    """Test compress function."""
+
+    def test_keeps_only_changed_lines(self):
+        """Test that context and header lines are dropped."""
+        result = compress(DIFF, 4000)
+
+        assert result == (
+            "<FILE>app.py</FILE>\n"
+            "<REMOVED>\ndef old():\n</REMOVED>\n"
+            "<ADDED>\ndef new():\n</ADDED>\n"
+            "<ADDED>\n    cleanup()\n</ADDED>\n"
+            "<FILE>new.txt</FILE>\n"
+            "<ADDED>\nhello\n</ADDED>\n"
+        )
+
+    def test_clips_long_blocks_to_budget(self):
+        """Test that long blocks keep their head and tail."""
+        added = "\n".join(f"+line {i}" for i in range(200))
+        diff = f"diff --git a/big.py b/big.py\n--- a/big.py\n+++ b/big.py\n@@ -0,0 +1,200 @@\n{added}\n"
+
+        result = compress(diff, 500)
+
+        assert len(result) <= 500
+        assert "line 0" in result
+        assert "line 199" in result
+        assert "..." in result
+
+    def test_non_diff_input_is_sliced(self):
+        """Test fallback for text that is not a unified diff."""
+        assert compress("x" * 50, 30) == "x" * 9 + TRUNCATED_MARKER
+        assert compress("short", 10) == "short"
+
+    def test_patches_stop_after_budget(self):
+        """Test that patches past the budget are not consumed."""
+        consumed = []
+
+        def patches():
+            for i in range(10):
+                consumed.append(i)
+                yield f"f{i}.py", "M", b"@@ -1 +1 @@\n-" + b"a" * 100 + b"\n+" + b"b" * 100 + b"\n"
+
+        result = compress_patches(patches(), 300)
+
+        assert consumed == [0, 1]
+        assert len(result) <= 300
+        assert result.startswith("<FILE>f0.py</FILE>\n<REMOVED>\n")
+        assert result.endswith(TRUNCATED_MARKER)
+
+
+class TestStripContext:
+    """Test strip_context function."""
+
+    def test_drops_context_lines_in_hunks(self):
+        """Test that only context lines inside hunks are removed."""
+        result = strip_context(DIFF)
+
+        assert result == (
+            "diff --git a/app.py b/app.py\n"
+            "index 1234567..89abcde 100644\n"
+            "--- a/app.py\n"
+            "+++ b/app.py\n"
+            "@@ -1,4 +1,4 @@\n"
+            "-def old():\n"
+            "+def new():\n"
+            "@@ -10,2 +10,3 @@ def main():\n"
+            "+    cleanup()\n"
+            "diff --git a/new.txt b/new.txt\n"
+            "new file mode 100644\n"
+            "--- /dev/null\n"
+            "+++ b/new.txt\n"
+            "@@ -0,0 +1 @@\n"
+            "+hello\n"
+        )
+
+    def test_compressed_diff_is_unchanged(self):
+        """Test that indented lines outside hunks are kept."""
+        compressed = compress(DIFF, 4000)
+
+        assert strip_context(compressed) == compressed
@@ -1,10 +1,26 @@
 """Tests for git_utils module."""
 
+import re
+import sys
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import git
 from git_ai.git_utils import GitRepo, GitError
 
+_NOT_A_REPO = re.compile("Not a git repository")
+_NO_STAGED = re.compile("No staged changes")
+
+
+@pytest.fixture(autouse=True, params=["pygit2", "gitpython"])
+def diff_backend(request, monkeypatch):
+    """Run every test with and without the optional pygit2 backend."""
+    if request.param == "pygit2":
+        pytest.importorskip("pygit2")
+    else:
+        monkeypatch.setitem(sys.modules, "pygit2", None)
+    return request.param
+
 
 class TestGitRepo:
     """Test GitRepo class."""
@@ -13,7 +29,6 @@ class TestGitRepo:
         """Test initialization with valid git repository."""
         # Create a git repo
         repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
         git.Repo.init(repo_path)
 
         # Should initialize without error
@@ -27,35 +42,20 @@ class TestGitRepo:
         non_repo.mkdir()
 
         # Should raise GitError
-        with pytest.raises(GitError, match="Not a git repository"):
+        with pytest.raises(GitError, match=_NOT_A_REPO):
             GitRepo(non_repo)
 
-    def test_has_staged_changes_empty(self, tmp_path):
+    def test_has_staged_changes_empty(self, initialized_repo):
         """Test has_staged_changes with no changes."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
-        test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
+        repo_path, _ = initialized_repo
 
         git_repo = GitRepo(repo_path)
         assert not git_repo.has_staged_changes()
 
-    def test_has_staged_changes_with_changes(self, tmp_path):
+    def test_has_staged_changes_with_changes(self, initialized_repo):
         """Test has_staged_changes with staged changes."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
+        repo_path, repo = initialized_repo
         test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
 
         # Make changes and stage
         test_file.write_text("modified content")
@@ -64,17 +64,9 @@ class TestGitRepo:
         git_repo = GitRepo(repo_path)
         assert git_repo.has_staged_changes()
 
-    def test_get_staged_files(self, tmp_path):
+    def test_get_staged_files(self, initialized_repo):
         """Test getting list of staged files."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
-        test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
+        repo_path, repo = initialized_repo
 
         # Add new file
         new_file = repo_path / "new.txt"
@@ -85,34 +77,19 @@ class TestGitRepo:
         staged_files = git_repo.get_staged_files()
         assert "new.txt" in staged_files
 
-    def test_get_staged_diff_no_changes(self, tmp_path):
+    def test_get_staged_diff_no_changes(self, initialized_repo):
         """Test get_staged_diff with no staged changes."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
-        test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
+        repo_path, _ = initialized_repo
 
         git_repo = GitRepo(repo_path)
         
-        with pytest.raises(GitError, match="No staged changes"):
+        with pytest.raises(GitError, match=_NO_STAGED):
             git_repo.get_staged_diff()
 
-    def test_get_diff_summary(self, tmp_path):
+    def test_get_diff_summary(self, initialized_repo):
         """Test getting structured diff summary."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
+        repo_path, repo = initialized_repo
         test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
 
         # Modify file
         test_file.write_text("modified content")
@@ -125,17 +102,10 @@ class TestGitRepo:
         assert len(summary["files_changed"]) == 1
         assert summary["files_changed"][0]["type"] == "M"
 
-    def test_commit(self, tmp_path):
+    def test_commit(self, initialized_repo):
         """Test creating a commit."""
-        repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
-        repo = git.Repo.init(repo_path)
-
-        # Create initial commit
+        repo_path, repo = initialized_repo
         test_file = repo_path / "test.txt"
-        test_file.write_text("initial content")
-        repo.index.add(["test.txt"])
-        repo.index.commit("Initial commit")
 
         # Stage changes
         test_file.write_text("modified content")
@@ -150,7 +120,6 @@ class TestGitRepo:
     def test_get_recent_commits(self, tmp_path):
         """Test getting recent commits."""
         repo_path = tmp_path / "test_repo"
-        repo_path.mkdir()
         repo = git.Repo.init(repo_path)
 
         # Create multiple commits
@@ -166,3 +135,151 @@ class TestGitRepo:
         assert len(recent) == 2
         assert "message" in recent[0]
         assert "hash" in recent[0]
+
+    def test_get_diff_summary_added_file(self, initialized_repo):
+        """Test that newly staged files are reported as added."""
+        repo_path, repo = initialized_repo
+
+        # Add new file
+        new_file = repo_path / "new.txt"
+        new_file.write_text("new content")
+        repo.index.add(["new.txt"])
+
+        git_repo = GitRepo(repo_path)
+        summary = git_repo.get_diff_summary()
+
+        assert summary["additions"] == 1
+        assert summary["deletions"] == 0
+        assert summary["files_changed"] == [{"path": "new.txt", "type": "A"}]
+
+    def test_get_staged_diff(self, initialized_repo):
+        """Test getting diff of staged changes."""
+        repo_path, repo = initialized_repo
+        test_file = repo_path / "test.txt"
+
+        # Modify file
+        test_file.write_text("modified content\n")
+        repo.index.add(["test.txt"])
+
+        git_repo = GitRepo(repo_path)
+        diff = git_repo.get_staged_diff()
+
+        assert "diff --git a/test.txt b/test.txt" in diff
+        assert "-initial content" in diff
+        assert "+modified content" in diff
+
+    def test_get_staged_diff_max_bytes(self, initialized_repo):
+        """Test that get_staged_diff stops reading at max_bytes."""
+        repo_path, repo = initialized_repo
+        test_file = repo_path / "test.txt"
+
+        # Stage a large change
+        test_file.write_text("modified content\n" * 10000)
+        repo.index.add(["test.txt"])
+
+        git_repo = GitRepo(repo_path)
+        diff = git_repo.get_staged_diff(max_bytes=100)
+
+        assert len(diff) == 100
+        assert diff.startswith("diff --git a/test.txt b/test.txt")
+        # The full patches were never built
+        assert "_staged_diff_index" not in vars(git_repo)
+
+    def test_commit_clears_staged_changes(self, initialized_repo):
+        """Test that staged-change queries are refreshed after committing."""
+        repo_path, repo = initialized_repo
+        test_file = repo_path / "test.txt"
+
+        # Stage changes
+        test_file.write_text("modified content")
+        repo.index.add(["test.txt"])
+
+        git_repo = GitRepo(repo_path)
+        assert git_repo.has_staged_changes()
+
+        git_repo.commit("Test commit message")
+        assert not git_repo.has_staged_changes()
+
+    def test_iter_staged_patches(self, initialized_repo):
+        """Test iterating staged changes per file."""
+        repo_path, repo = initialized_repo
+        test_file = repo_path / "test.txt"
+
+        # Modify file and add new file
+        test_file.write_text("modified content\n")
+        new_file = repo_path / "new.txt"
+        new_file.write_text("new content\n")
+        repo.index.add(["test.txt", "new.txt"])
+
+        git_repo = GitRepo(repo_path)
+        patches = {path: (change_type, patch) for path, change_type, patch in git_repo.iter_staged_patches()}
+
+        assert patches["new.txt"][0] == "A"
+        assert b"+new content" in patches["new.txt"][1]
+        assert patches["test.txt"][0] == "M"
+        assert b"-initial content" in patches["test.txt"][1]
+
+    def test_repo_per_thread(self, tmp_path):
+        """Test that each thread gets its own git.Repo instance."""
+        repo_path = tmp_path / "test_repo"
+        git.Repo.init(repo_path)
+
+        git_repo = GitRepo(repo_path)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            other = pool.submit(lambda: git_repo.repo).result()
+
+        assert other is not git_repo.repo
+        assert other.working_dir == git_repo.repo.working_dir
+
+    def test_rename(self, initialized_repo):
+        """Test that a moved file is one rename on both backends."""
+        repo_path, repo = initialized_repo
+        (repo_path / "old.txt").write_text("".join(f"line {i}\n" for i in range(50)))
+        repo.index.add(["old.txt"])
+        repo.index.commit("Add old.txt")
+        repo.git.mv("old.txt", "new.txt")
+
+        git_repo = GitRepo(repo_path)
+
+        assert git_repo.get_staged_files() == ["new.txt"]
+        assert git_repo.get_diff_summary()["files_changed"] == [{"path": "new.txt", "type": "R"}]
+        assert git_repo.get_commit_stats() == (1, 0)
+
+    def test_get_commit_stats(self, tmp_path):
+        """Test counting staged files and changed lines."""
+        repo_path = tmp_path / "test_repo"
+        repo = git.Repo.init(repo_path)
+
+        # Create initial commit
+        test_file = repo_path / "test.txt"
+        test_file.write_text("line 1\nline 2\n")
+        repo.index.add(["test.txt"])
+        repo.index.commit("Initial commit")
+
+        # Modify one line and add a two-line file
+        test_file.write_text("line 1\nchanged\n")
+        new_file = repo_path / "new.txt"
+        new_file.write_text("a\nb\n")
+        repo.index.add(["test.txt", "new.txt"])
+
+        git_repo = GitRepo(repo_path)
+        files_changed, total_changes = git_repo.get_commit_stats()
+
+        assert files_changed == 2
+        assert total_changes == 4  # matches git diff --cached --shortstat
+
+    def test_get_recent_commits_after_commit(self, initialized_repo):
+        """Test that recent commits include a commit made through GitRepo."""
+        repo_path, repo = initialized_repo
+        test_file = repo_path / "test.txt"
+
+        git_repo = GitRepo(repo_path)
+        assert git_repo.get_recent_commits() == git_repo.get_recent_commits()
+
+        # Stage changes and commit
+        test_file.write_text("modified content")
+        repo.index.add(["test.txt"])
+        git_repo.commit("Second commit")
+
+        recent = git_repo.get_recent_commits()
+        assert [c["message"] for c in recent] == ["Second commit", "Initial commit"]
@@ -0,0 +1,603 @@
+"""Tests for llm_client module."""
+
+import asyncio
+import importlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import pytest
+
+from git_ai import llm_client
+from git_ai.cache import response_cache
+from git_ai.config import config
+from git_ai.llm_client import (
+    LLMClient,
+    MOCK_COMMIT_MESSAGE,
+    SYSTEM_PROMPT,
+    _encoding,
+    _parse_variants,
+    _refine_locally,
+)
+
+
+MESSAGE = "Feat(cli): Add cache command.\n\nStores messages on disk."
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4-turbo-preview",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "fix: retry transient errors"},
+    }],
+}
+
+ANTHROPIC_MESSAGE = {
+    "id": "msg_1",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-sonnet-4-20250514",
+    "content": [{"type": "text", "text": "fix: retry transient errors"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 10, "output_tokens": 5},
+}
+
+SUMMARY = {
+    "files_changed": [{"path": "x", "type": "M"}],
+    "additions": 0,
+    "modifications": 1,
+    "deletions": 0,
+}
+
+
+class TestRefineLocally:
+    """Test _refine_locally function."""
+
+    def test_lowercase_subject(self):
+        """Test that lowercasing only touches the subject line."""
+        assert _refine_locally(MESSAGE, "lowercase it") == (
+            "feat(cli): add cache command.\n\nStores messages on disk."
+        )
+
+    def test_remove_period(self):
+        """Test that the trailing period of the subject is dropped."""
+        assert _refine_locally(MESSAGE, "No period.") == (
+            "Feat(cli): Add cache command\n\nStores messages on disk."
+        )
+
+    def test_subject_only(self):
+        """Test that the body is dropped."""
+        assert _refine_locally(MESSAGE, "make it shorter") == "Feat(cli): Add cache command."
+
+    def test_falls_through(self):
+        """Test that other or no-op feedback is left to the LLM."""
+        assert _refine_locally(MESSAGE, "mention the config key") is None
+        assert _refine_locally(MESSAGE, "lowercase it and mention the config key") is None
+        assert _refine_locally("fix: typo", "make it shorter") is None
+
+
+class TestParseVariants:
+    """Test _parse_variants function."""
+
+    def test_json_array(self):
+        """Test that each entry is stripped."""
+        assert _parse_variants('["fix: a ", "fix: b"]') == ["fix: a", "fix: b"]
+
+    def test_fenced_with_prose(self):
+        """Test that fences and text around the array are ignored."""
+        text = 'Here you go:\n```json\n["fix: a",\n "feat: b"]\n```\nEnjoy!'
+        assert _parse_variants(text) == ["fix: a", "feat: b"]
+
+    def test_not_json(self):
+        """Test that a reply without a JSON array is used as one message."""
+        assert _parse_variants("fix: a") == ["fix: a"]
+        assert _parse_variants("fix: handle [x] and [y") == ["fix: handle [x] and [y"]
+
+
+class TestEncoding:
+    """Test _encoding function."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Keep fake tokenizers out of the memoized encodings."""
+        _encoding.cache_clear()
+        yield
+        _encoding.cache_clear()
+
+    @pytest.fixture
+    def offline(self, monkeypatch):
+        """tiktoken whose BPE download fails."""
+
+        class OfflineTiktoken:
+            @staticmethod
+            def encoding_for_model(model):
+                raise ConnectionError("tiktoken BPE download failed")
+
+        monkeypatch.setitem(sys.modules, "tiktoken", OfflineTiktoken)
+
+    def test_offline_falls_back(self, offline):
+        """Test that a failed BPE download means no encoding."""
+        assert _encoding("gpt-4-turbo-preview") is None
+
+    def test_offline_truncates_by_length(self, offline, monkeypatch):
+        """Test that OpenAI diffs are cut to the estimated token budget."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        monkeypatch.setitem(config.config, "max_diff_tokens", 10)
+        client = LLMClient("openai")
+
+        assert client._truncate_diff("x" * 100) == "x" * 40 + llm_client.TRUNCATED_MARKER
+
+
+class TestMockProvider:
+    """Test the offline mock provider."""
+
+    @pytest.fixture
+    def client(self, monkeypatch, response_cache_path):
+        """LLMClient selected through GIT_AI_PROVIDER."""
+        monkeypatch.setenv("GIT_AI_PROVIDER", "mock")
+        return LLMClient()
+
+    def test_env_selects_provider(self, client):
+        """Test that GIT_AI_PROVIDER overrides the configured provider."""
+        assert client.provider == "mock"
+        assert client.model == "mock"
+        assert client.client is None
+
+    def test_dotenv_selects_provider_and_key(self, tmp_path, monkeypatch):
+        """Test that GIT_AI_PROVIDER from .env is applied before the key is read."""
+        import dotenv
+
+        env_file = tmp_path / ".env"
+        env_file.write_text(
+            "GIT_AI_PROVIDER=openai\n"
+            "OPENAI_API_KEY=sk-openai\n"
+            "ANTHROPIC_API_KEY=sk-anthropic\n"
+        )
+        for name in ("GIT_AI_PROVIDER", "OPENAI_API_KEY", "ANTHROPIC_API_KEY"):
+            monkeypatch.delenv(name, raising=False)
+        # git_ai re-exports the config instance under the module's name
+        config_module = importlib.import_module("git_ai.config")
+        monkeypatch.setattr(config_module, "_env_loaded", False)
+        load_dotenv = dotenv.load_dotenv
+        monkeypatch.setattr(dotenv, "load_dotenv", lambda: load_dotenv(env_file))
+        monkeypatch.setitem(config.config, "provider", "anthropic")
+
+        client = LLMClient()
+
+        assert client.provider == "openai"
+        assert client._client_key == ("openai", "sk-openai", None)
+
+    def test_generate(self, client):
+        """Test that every generation path returns the fixed message."""
+        args = ("diff --git a/x b/x", SUMMARY, [])
+        assert client.generate_commit_message(*args) == MOCK_COMMIT_MESSAGE
+        assert "".join(client.stream_commit_message(*args)) == MOCK_COMMIT_MESSAGE
+        assert client.generate_variants(*args) == [MOCK_COMMIT_MESSAGE]
+        assert client.generate_commit_messages_batch([(*args, "simple")] * 2) == [
+            MOCK_COMMIT_MESSAGE
+        ] * 2
+        assert asyncio.run(client.agenerate_commit_message(*args)) == MOCK_COMMIT_MESSAGE
+        assert client.refine_message("fix: typo", "mention the config key") == (
+            MOCK_COMMIT_MESSAGE
+        )
+
+    def test_skips_response_cache(self, client, response_cache_path):
+        """Test that mock messages are never cached."""
+        client.generate_commit_message("diff --git a/x b/x", SUMMARY, [])
+
+        assert not client.cache_hit
+        assert not response_cache_path.exists()
+
+
+@pytest.fixture
+def response_cache_path(tmp_path, monkeypatch):
+    """Point the response cache at tmp_path and enable it."""
+    monkeypatch.setattr(response_cache, "cache_path", tmp_path / "llm_cache.sqlite")
+    monkeypatch.setitem(config.config, "cache_enabled", True)
+    return response_cache.cache_path
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Serve queued status codes to an OpenAI LLMClient over a mock transport.
+
+    Returns:
+        Tuple of (client, statuses, attempts). Each request pops the
+        next status from ``statuses``; 200 answers with COMPLETION and a
+        list of strings with a stream of those content deltas.
+    """
+    import openai
+
+    # The HTTP package the SDK is built on
+    http = sys.modules[type(openai._constants.DEFAULT_CONNECTION_LIMITS).__module__]
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setitem(config.config, "max_retries", 2)
+    statuses = []
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        status = statuses.pop(0)
+        if isinstance(status, list):
+            return http.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                text=stream_events(status),
+            )
+        if status == 200:
+            return http.Response(200, json=COMPLETION)
+        # Keep the SDK's backoff short
+        return http.Response(status, headers={"retry-after-ms": "1"}, json={})
+
+    def build_client(provider, api_key, base_url=None, asynchronous=False):
+        if asynchronous:
+            http_client = http.AsyncClient(transport=http.MockTransport(handler))
+            return openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+        http_client = http.Client(transport=http.MockTransport(handler))
+        return openai.OpenAI(api_key=api_key, http_client=http_client)
+
+    monkeypatch.setattr(llm_client, "_build_client", build_client)
+    monkeypatch.setattr(llm_client, "_CLIENT_CACHE", {})
+    return LLMClient("openai"), statuses, attempts
+
+
+def stream_events(deltas: list[str]) -> str:
+    """Server-sent events of an OpenAI chat completion streaming deltas."""
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4-turbo-preview",
+    }
+    events = [
+        {**chunk, "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+        for delta in deltas
+    ]
+    events.append({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+
+
+@pytest.fixture
+def anthropic_calls(monkeypatch):
+    """Anthropic LLMClient that records SDK calls instead of sending them.
+
+    Returns:
+        Tuple of (client, calls), where ``calls`` collects (endpoint, request)
+        pairs and every call answers with ANTHROPIC_MESSAGE.
+    """
+    import anthropic
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test")
+    client = LLMClient("anthropic")
+    calls = []
+
+    def call(endpoint, request):
+        calls.append((endpoint, request))
+        return anthropic.types.Message.model_validate(ANTHROPIC_MESSAGE)
+
+    monkeypatch.setattr(client, "_call", call)
+    return client, calls
+
+
+@pytest.fixture
+def anthropic_batches(monkeypatch):
+    """Anthropic LLMClient served by a fake Message Batches API.
+
+    Returns:
+        Tuple of (client, server). ``server["status"]`` is the processing
+        status reported for the batch, ``server["results"]`` the entries
+        served as JSONL and ``server["requests"]`` the (method, path) pairs
+        received.
+    """
+    import anthropic
+
+    # The HTTP package the SDK is built on
+    http = sys.modules[type(anthropic._constants.DEFAULT_CONNECTION_LIMITS).__module__]
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test")
+    monkeypatch.setitem(config.config, "batch_poll_interval", 0)
+    base = "https://api.anthropic.com/v1/messages/batches"
+    server = {"status": "ended", "results": [], "requests": []}
+
+    def batch(status):
+        return {
+            "id": "msgbatch_1",
+            "type": "message_batch",
+            "processing_status": status,
+            "request_counts": {
+                "canceled": 0, "errored": 0, "expired": 0, "processing": 0, "succeeded": 0,
+            },
+            "created_at": "2025-01-01T00:00:00Z",
+            "expires_at": "2025-01-02T00:00:00Z",
+            "ended_at": None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{base}/msgbatch_1/results" if status == "ended" else None,
+        }
+
+    def handler(request):
+        path = request.url.path
+        server["requests"].append((request.method, path))
+        if path.endswith("/results"):
+            lines = "".join(json.dumps(entry) + "\n" for entry in server["results"])
+            return http.Response(200, text=lines)
+        if request.method == "POST" and path == "/v1/messages/batches":
+            return http.Response(200, json=batch("in_progress"))
+        if path.endswith("/cancel"):
+            return http.Response(200, json=batch("canceling"))
+        return http.Response(200, json=batch(server["status"]))
+
+    def build_client(provider, api_key, base_url=None, asynchronous=False):
+        http_client = http.Client(transport=http.MockTransport(handler))
+        return anthropic.Anthropic(api_key=api_key, http_client=http_client)
+
+    monkeypatch.setattr(llm_client, "_build_client", build_client)
+    monkeypatch.setattr(llm_client, "_CLIENT_CACHE", {})
+    return LLMClient("anthropic"), server
+
+
+def batch_entry(custom_id: str, text: Optional[str]) -> dict:
+    """Message Batch result for a request; a None text is an errored request."""
+    if text is None:
+        return {
+            "custom_id": custom_id,
+            "result": {
+                "type": "errored",
+                "error": {"type": "error", "error": {"type": "api_error", "message": "boom"}},
+            },
+        }
+    message = {**ANTHROPIC_MESSAGE, "content": [{"type": "text", "text": text}]}
+    return {"custom_id": custom_id, "result": {"type": "succeeded", "message": message}}
+
+
+class TestAnthropicBatch:
+    """Test Message Batch generation."""
+
+    ITEMS = [(f"diff --git a/{i} b/{i}", SUMMARY, [], "simple") for i in range(3)]
+
+    @pytest.fixture(autouse=True)
+    def no_response_cache(self, monkeypatch):
+        """Send every item to the batch."""
+        monkeypatch.setitem(config.config, "cache_enabled", False)
+
+    def test_orders_by_custom_id(self, anthropic_batches):
+        """Test that results are matched to items by custom_id, not position."""
+        client, server = anthropic_batches
+        server["results"] = [batch_entry("2", "c"), batch_entry("0", "a"), batch_entry("1", "b")]
+
+        assert client.generate_commit_messages_batch(self.ITEMS) == ["a", "b", "c"]
+        assert ("GET", "/v1/messages/batches/msgbatch_1") in server["requests"]
+
+    def test_failed_entry(self, anthropic_batches):
+        """Test that a request that didn't succeed fails the whole call."""
+        client, server = anthropic_batches
+        server["results"] = [batch_entry("0", "a"), batch_entry("1", None), batch_entry("2", "c")]
+
+        with pytest.raises(RuntimeError, match="Batch request 1 failed: errored"):
+            client.generate_commit_messages_batch(self.ITEMS)
+
+    def test_timeout_cancels(self, anthropic_batches, monkeypatch):
+        """Test that a batch still running at batch_timeout is cancelled."""
+        client, server = anthropic_batches
+        server["status"] = "in_progress"
+        monkeypatch.setitem(config.config, "batch_timeout", 0)
+
+        with pytest.raises(TimeoutError):
+            client.generate_commit_messages_batch(self.ITEMS)
+        assert server["requests"][-1] == ("POST", "/v1/messages/batches/msgbatch_1/cancel")
+
+
+class TestRequestShape:
+    """Test the requests sent to the providers."""
+
+    def test_anthropic_refine_replays_exchange(self, anthropic_calls, response_cache_path):
+        """Test that refinement replays the cached prompt and the reply."""
+        client, calls = anthropic_calls
+        message = client.generate_commit_message("diff --git a/x b/x", SUMMARY, [])
+        client.refine_message(message, "mention retries")
+
+        system_prefix, prompt = client._last_context
+        (_, first), (_, refine) = calls
+        system = [{"type": "text", "text": system_prefix, "cache_control": {"type": "ephemeral"}}]
+        assert first["system"] == system
+        assert first["messages"] == [{"role": "user", "content": prompt}]
+
+        assert refine["system"] == system
+        assert refine["max_tokens"] == int(config.get("refine_max_tokens", 150))
+        history, reply, feedback = refine["messages"]
+        assert history == {
+            "role": "user",
+            "content": [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}],
+        }
+        assert reply == {"role": "assistant", "content": message}
+        assert feedback["role"] == "user"
+        assert "mention retries" in feedback["content"]
+
+    def test_openai_refine_replays_exchange(self, transport, response_cache_path):
+        """Test that the system prompt leads and the exchange is replayed verbatim."""
+        client, statuses, attempts = transport
+        statuses.extend([200, 200])
+        message = client.generate_commit_message("diff --git a/x b/x", SUMMARY, [])
+        client.refine_message(message, "mention retries")
+
+        system_prefix, prompt = client._last_context
+        refine = json.loads(attempts[1].content)
+        system, history, reply, feedback = refine["messages"]
+        assert system == {"role": "system", "content": system_prefix}
+        assert history == {"role": "user", "content": prompt}
+        assert reply == {"role": "assistant", "content": message}
+        assert "mention retries" in feedback["content"]
+
+    def test_refine_without_context(self, anthropic_calls):
+        """Test that refining a message that wasn't generated sends it inline."""
+        client, calls = anthropic_calls
+        client.refine_message("fix: typo", "mention retries")
+
+        ((endpoint, request),) = calls
+        assert endpoint == "messages.create"
+        assert request["system"][0]["text"] == SYSTEM_PROMPT
+        (user,) = request["messages"]
+        assert "fix: typo" in user["content"]
+        assert "mention retries" in user["content"]
+
+
+@pytest.fixture
+def keepalive_server():
+    """Local HTTP/1.1 server answering every POST with COMPLETION.
+
+    Connections are kept alive, so clients pool them between requests.
+
+    Returns:
+        Base URL of the server's OpenAI-compatible API.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps(COMPLETION).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+class TestAsyncClient:
+    """Test LLMClient.aclient."""
+
+    def test_survives_new_event_loop(self, keepalive_server, monkeypatch):
+        """Test that one client works across asyncio.run() calls."""
+        monkeypatch.setattr(llm_client, "OLLAMA_BASE_URL", keepalive_server)
+        monkeypatch.setattr(llm_client, "_CLIENT_CACHE", {})
+        monkeypatch.setitem(config.config, "cache_enabled", False)
+        client = LLMClient("ollama")
+        args = ("diff --git a/x b/x", SUMMARY, [])
+
+        for _ in range(2):
+            message = asyncio.run(client.agenerate_commit_message(*args))
+            assert message == "fix: retry transient errors"
+
+
+class TestPreparePrompt:
+    """Test LLMClient._prepare_prompt."""
+
+    def test_rebuilds_after_mutation(self):
+        """Test that in-place changes to the inputs reach the prompt."""
+        client = LLMClient("ollama")
+        summary = {**SUMMARY, "files_changed": list(SUMMARY["files_changed"])}
+        args = ("diff --git a/x b/x", summary, [], "simple")
+        client._prepare_prompt(*args)
+
+        summary["files_changed"].append({"path": "new.py", "type": "A"})
+
+        assert "new.py" in client._prepare_prompt(*args)[1]
+
+
+class TestResponseCache:
+    """Test response cache use across generation paths."""
+
+    def test_async_uses_cache(self, transport, response_cache_path):
+        """Test that agenerate_commit_message reads and fills the cache."""
+        client, statuses, attempts = transport
+        statuses.append(200)
+        args = ("diff --git a/x b/x", SUMMARY, [])
+
+        first = asyncio.run(client.agenerate_commit_message(*args))
+        assert not client.cache_hit
+        assert client.generate_commit_message(*args) == first
+        assert asyncio.run(client.agenerate_commit_message(*args)) == first
+        assert client.cache_hit
+        assert len(attempts) == 1
+
+    def test_batch_sends_only_misses(self, transport, response_cache_path):
+        """Test that batch generation skips cached messages."""
+        client, statuses, attempts = transport
+        statuses.extend([200, 200])
+        items = [(f"diff --git a/{i} b/{i}", SUMMARY, [], "simple") for i in range(2)]
+
+        client.generate_commit_message(*items[0])
+        messages = client.generate_commit_messages_batch(items)
+
+        assert messages == ["fix: retry transient errors"] * 2
+        assert client.generate_commit_messages_batch(items) == messages
+        assert len(attempts) == 2
+
+
+class TestStreaming:
+    """Test stream_commit_message over an OpenAI event stream."""
+
+    ARGS = ("diff --git a/x b/x", SUMMARY, [])
+
+    def test_yields_chunks_in_order(self, transport, response_cache_path):
+        """Test that deltas are yielded as they arrive and cached joined."""
+        client, statuses, attempts = transport
+        statuses.append(["fix: ", "retry ", "transient errors\n"])
+
+        assert list(client.stream_commit_message(*self.ARGS)) == [
+            "fix: ", "retry ", "transient errors\n",
+        ]
+        assert list(client.stream_commit_message(*self.ARGS)) == [
+            "fix: retry transient errors",
+        ]
+        assert client.cache_hit
+        assert len(attempts) == 1
+
+    def test_empty_stream_not_cached(self, transport, response_cache_path):
+        """Test that a stream without content doesn't cache an empty message."""
+        client, statuses, attempts = transport
+        statuses.extend([[], 200])
+
+        assert list(client.stream_commit_message(*self.ARGS)) == []
+        assert client.generate_commit_message(*self.ARGS) == "fix: retry transient errors"
+        assert len(attempts) == 2
+
+
+class TestRetries:
+    """Test retries of failed provider requests."""
+
+    def test_transient_errors_are_retried(self, transport):
+        """Test that overloaded, rate-limited and server errors are retried."""
+        client, statuses, attempts = transport
+        statuses.extend([529, 429, 200])
+
+        assert client.refine_message("fix: typo", "mention retries") == (
+            "fix: retry transient errors"
+        )
+        assert len(attempts) == 3
+
+    def test_async_errors_are_retried(self, transport):
+        """Test that the async path retries the same way."""
+        client, statuses, attempts = transport
+        statuses.extend([503, 200])
+
+        refined = asyncio.run(client.arefine_message("fix: typo", "mention retries"))
+
+        assert refined == "fix: retry transient errors"
+        assert len(attempts) == 2
+
+    def test_gives_up_after_max_retries(self, transport):
+        """Test that the error is raised once max_retries is used up."""
+        import openai
+
+        client, statuses, attempts = transport
+        statuses.extend([500, 500, 500, 200])
+
+        with pytest.raises(openai.InternalServerError):
+            client.refine_message("fix: typo", "mention retries")
+        assert len(attempts) == 3